@@ -1,7 +1,7 @@
 from typing import Any, Dict, List, Optional, Tuple
 from django.contrib import admin
 from django.http.request import HttpRequest
-from .models import User, PasswordResetToken
+from .models import User, PasswordResetToken, UserImportJob
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth.hashers import make_password, identify_hasher
 from django.contrib.auth.models import Group
@@ -83,3 +83,20 @@ admin.site.unregister(Group)
 class PasswordResetTokenAdmin(admin.ModelAdmin):
     list_display = ["user"]
     ordering = ["created_at"]
+
+
+@admin.register(UserImportJob)
+class UserImportJobAdmin(admin.ModelAdmin):
+    list_display = [
+        "id",
+        "organization",
+        "status",
+        "processed",
+        "created",
+        "updated",
+        "failed",
+        "created_at",
+        "updated_at",
+    ]
+    list_filter = ["status", "organization"]
+    raw_id_fields = ["created_by"]
@@ -0,0 +1,91 @@
+import csv
+import io
+import tempfile
+import zlib
+from itertools import islice
+
+from openpyxl import Workbook
+
+# users read from the database, and rows written, at a time
+EXPORT_CHUNK_SIZE = 2000
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+USER_COLUMNS = [
+    ("User Id", "user_id"),
+    ("First Name", "first_name"),
+    ("Last Name", "last_name"),
+    ("Designation", "designation"),
+    ("Department", "department"),
+    ("Work Location", "work_location"),
+]
+IMMERTIVE_COLUMNS = [
+    ("Mobile No", "user_id"),
+    *USER_COLUMNS[1:],
+    ("Date of Birth", "date_of_birth"),
+    ("Gender", "gender"),
+    ("Course", "course"),
+    ("Batch", "batch"),
+    ("Roll No.", "roll_no"),
+    ("Institute", "institute"),
+    ("City", "city"),
+    ("State", "state"),
+    ("VR Lab", "vr_lab"),
+]
+
+
+class UserExport:
+    """
+    Writes user rosters without holding them in memory: the rows come from
+    a values_list iterator and CSV is produced, and optionally gzipped,
+    EXPORT_CHUNK_SIZE rows at a time for a StreamingHttpResponse.
+    """
+
+    def get_columns(organization):
+        """
+        Returns (headings, User fields) of the roster of the organization.
+        """
+        if organization.name.lower() == "immertive":
+            columns = IMMERTIVE_COLUMNS
+        else:
+            columns = USER_COLUMNS
+        return [heading for heading, _ in columns], [field for _, field in columns]
+
+    def get_rows(users, fields):
+        return users.values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    def iter_csv(rows, headings):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(headings)
+        while True:
+            chunk = list(islice(rows, EXPORT_CHUNK_SIZE))
+            writer.writerows(chunk)
+            yield buffer.getvalue()
+            if not chunk:
+                return
+            buffer.seek(0)
+            buffer.truncate()
+
+    def gzip(chunks):
+        compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+        for chunk in chunks:
+            data = compressor.compress(chunk.encode())
+            if data:
+                yield data
+        yield compressor.flush()
+
+    def write_xlsx(rows, headings):
+        """
+        Returns a temporary file with the rows as an XLSX workbook. openpyxl
+        in write only mode spools the rows to disk as they are appended, the
+        workbook is only zipped once complete.
+        """
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Users")
+        sheet.append(headings)
+        for row in rows:
+            sheet.append(row)
+        output = tempfile.TemporaryFile()
+        workbook.save(output)
+        output.seek(0)
+        return output
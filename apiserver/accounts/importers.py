@@ -0,0 +1,550 @@
+import codecs
+import csv
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
+
+from accounts.models import User
+from accounts.serializers import CreateUserUsingCSVSerializer
+from organizations.cache import AnalyticsCache
+from organizations.rollups import ModuleActivityRollups
+
+HEADINGS_CHANGED_ERROR = (
+    "It looks like the headers in the CSV file have been changed. Please make "
+    "sure to use the original template and try again."
+)
+# rows validated, hashed and upserted together
+IMPORT_CHUNK_SIZE = 500
+
+USER_HEADINGS = [
+    "First Name",
+    "Last Name",
+    "User Id",
+    "Designation",
+    "Department",
+    "Work Location",
+    "Password",
+]
+IMMERTIVE_HEADINGS = [
+    "First Name",
+    "Last Name",
+    "Mobile No",
+    "Designation",
+    "Department",
+    "Work Location",
+    "Date of Birth",
+    "Gender",
+    "Course",
+    "Batch",
+    "Roll No",
+    "Institute",
+    "City",
+    "State",
+    "VR Lab",
+    "PIN",
+]
+# the Immertive template has rows of instructions above its headings
+IMMERTIVE_PREAMBLE_ROWS = 4
+IMMERTIVE_COLUMNS = {"mobile_no": "user_id", "pin": "password"}
+
+# columns of the update template, Immertive users are found by mobile_no
+UPDATE_COLUMNS = ["user_id", "designation", "department", "work_location"]
+IMMERTIVE_UPDATE_COLUMNS = [
+    "mobile_no",
+    "designation",
+    "department",
+    "work_location",
+    "course",
+    "batch",
+    "roll_no",
+    "institute",
+    "city",
+    "state",
+    "vr_lab",
+]
+
+# times a chunk is written again after one of its users was created by
+# another request while it was being imported
+IMPORT_CONFLICT_RETRIES = 2
+
+# columns written when a deleted user is imported again
+UPSERT_FIELDS = [
+    "first_name",
+    "last_name",
+    "designation",
+    "department",
+    "work_location",
+    "access_type",
+    "email",
+    "date_of_birth",
+    "gender",
+    "course",
+    "batch",
+    "roll_no",
+    "institute",
+    "city",
+    "state",
+    "vr_lab",
+    "created_by_id",
+    "password",
+    "deleted",
+    "active",
+]
+
+
+def get_chunks(rows):
+    rows = iter(rows)
+    while chunk := list(islice(rows, IMPORT_CHUNK_SIZE)):
+        yield chunk
+
+
+class UserImportError(Exception):
+    """
+    The upload as a whole cannot be imported: it is empty or does not follow
+    the template.
+    """
+
+
+class UserImporter:
+    """
+    Imports learners from the CSV templates of DownloadTemplate.
+
+    The upload is parsed as it is read and handled IMPORT_CHUNK_SIZE rows at
+    a time: the rows are validated, their passwords hashed on
+    USER_IMPORT_HASH_WORKERS threads and the users upserted on
+    (organization, user_id) with bulk_create. A user that already exists
+    and is not deleted is a row error, a deleted one is replaced. Every row
+    error is collected rather than stopping at the first.
+    """
+
+    def read_rows(upload, organization):
+        """
+        Checks the headings of the upload and yields (row number, values by
+        column) of each row. Row numbers are the ones shown in row errors.
+        """
+        is_immertive = organization.name.lower() == "immertive"
+        reader = csv.reader(codecs.iterdecode(upload, "utf-8"), delimiter=",")
+        try:
+            if is_immertive:
+                for _ in range(IMMERTIVE_PREAMBLE_ROWS):
+                    next(reader)
+            headings = next(reader)
+        except StopIteration:
+            raise UserImportError("CSV file is empty or has no headers")
+        if headings != (IMMERTIVE_HEADINGS if is_immertive else USER_HEADINGS):
+            raise UserImportError(HEADINGS_CHANGED_ERROR)
+
+        columns = [heading.lower().replace(" ", "_") for heading in headings]
+        start = 1
+        if is_immertive:
+            columns = [IMMERTIVE_COLUMNS.get(column, column) for column in columns]
+            start = IMMERTIVE_PREAMBLE_ROWS + 2
+        for row_number, row in enumerate(reader, start=start):
+            yield row_number, dict(zip(columns, row))
+
+    def get_missing_fields_error(row_number, fields, organization):
+        if organization.name.lower() == "immertive":
+            columns = {value: key for key, value in IMMERTIVE_COLUMNS.items()}
+            fields = [columns.get(field, field) for field in fields]
+        names = [field.replace("_", " ").capitalize() for field in fields]
+        if len(names) == 1:
+            return "Required field {} is missing at row {}".format(names[0], row_number)
+        return "Required fields {} and {} are missing at row {}".format(
+            ", ".join(names[:-1]), names[-1], row_number
+        )
+
+    def get_user_data(row_number, row, organization, created_by, serializer):
+        """
+        Returns (user_id, column values of the user) of a row, or raises
+        UserImportError with the row error. serializer is a
+        CreateUserUsingCSVSerializer validating the rows, built once as
+        building its fields costs more than validating a row.
+        """
+        try:
+            serializer.run_validation(row)
+        except serializers.ValidationError as e:
+            raise UserImportError(
+                UserImporter.get_missing_fields_error(
+                    row_number, list(e.detail), organization
+                )
+            )
+
+        date_of_birth = None
+        if "date_of_birth" in row:
+            try:
+                date_of_birth = datetime.strptime(
+                    row["date_of_birth"], "%Y-%m-%d"
+                ).date()
+            except ValueError:
+                raise UserImportError(
+                    "Invalid date format. Expected format: YYYY-MM-DD at row {}".format(
+                        row_number
+                    )
+                )
+        gender = None
+        if "gender" in row:
+            gender = row["gender"] or "M"
+
+        user_id = row["user_id"]
+        return user_id, {
+            "first_name": row["first_name"],
+            "last_name": row["last_name"],
+            "designation": row["designation"],
+            "department": row["department"],
+            "work_location": row["work_location"],
+            "access_type": "Learner",
+            "email": row["first_name"].lower()
+            + str(user_id).lower()
+            + "@"
+            + organization.name.replace(" ", "-").lower()
+            + ".com",
+            "date_of_birth": date_of_birth,
+            "gender": gender,
+            "course": row.get("course", None),
+            "batch": row.get("batch", None),
+            "roll_no": row.get("roll_no", None),
+            "institute": row.get("institute", None),
+            "city": row.get("city", None),
+            "state": row.get("state", None),
+            "vr_lab": row.get("vr_lab", None),
+            "created_by": created_by,
+            "password": row.get("password", None),
+            "deleted": False,
+            "active": True,
+        }
+
+    def get_exists_error(row_number, row):
+        return (
+            "The user with given User Id {} at row {} for user {} already exists"
+        ).format(
+            row["user_id"],
+            row_number,
+            row["first_name"] + " " + row["last_name"],
+        )
+
+    def import_chunk(rows, organization, created_by, seen, pool, write=True):
+        """
+        Validates the rows and, with write, upserts the valid ones. seen
+        holds the user ids and emails of the rows of earlier chunks. Returns
+        (created, updated, row errors).
+        """
+        errors = []
+        users = []
+        serializer = CreateUserUsingCSVSerializer()
+        for row_number, row in rows:
+            try:
+                user_id, user_data = UserImporter.get_user_data(
+                    row_number, row, organization, created_by, serializer
+                )
+            except UserImportError as e:
+                errors.append({"row": row_number, "error": str(e)})
+                continue
+            if user_id in seen["user_ids"] or user_data["email"] in seen["emails"]:
+                errors.append(
+                    {
+                        "row": row_number,
+                        "error": UserImporter.get_exists_error(row_number, row),
+                    }
+                )
+                continue
+            seen["user_ids"].add(user_id)
+            seen["emails"].add(user_data["email"])
+            users.append((row_number, row, user_id, user_data))
+
+        hashed_passwords = {}
+        for retry in range(IMPORT_CONFLICT_RETRIES + 1):
+            try:
+                with transaction.atomic():
+                    created, updated, write_errors = UserImporter.upsert_users(
+                        users, organization, pool, hashed_passwords, write
+                    )
+                break
+            except IntegrityError:
+                # a user of the chunk was created by another request since it
+                # was read, the next pass reports it as existing
+                if retry == IMPORT_CONFLICT_RETRIES:
+                    raise
+        errors.extend(write_errors)
+        errors.sort(key=lambda error: error["row"])
+        return created, updated, errors
+
+    def get_existing(organization, user_ids, lock):
+        """
+        Returns {user_id: (pk, deleted)} of the users of the organization,
+        with lock locking them in id order.
+        """
+        users = User.objects.filter(organization=organization, user_id__in=user_ids)
+        if lock:
+            users = users.select_for_update().order_by("id")
+        return {
+            user_id: (pk, deleted)
+            for user_id, pk, deleted in users.values_list("user_id", "id", "deleted")
+        }
+
+    def upsert_users(users, organization, pool, hashed_passwords, write):
+        """
+        Creates the users that do not exist and replaces the deleted ones.
+        Returns (created, updated, row errors of users that exist).
+
+        The deleted users are locked before they are replaced, so one
+        restored meanwhile is not overwritten, and new users are inserted
+        without a conflict update, so one created meanwhile raises
+        IntegrityError instead of being overwritten. hashed_passwords keeps
+        the hashes by row number across retries.
+        """
+        existing = UserImporter.get_existing(
+            organization, [user_id for _, _, user_id, _ in users], lock=write
+        )
+        email_owners = dict(
+            User.objects.filter(
+                email__in=[user_data["email"] for _, _, _, user_data in users]
+            ).values_list("email", "id")
+        )
+        errors = []
+        created_users = []
+        replaced_users = []
+        for row_number, row, user_id, user_data in users:
+            pk, deleted = existing.get(user_id, (None, True))
+            owner = email_owners.get(user_data["email"])
+            if not deleted or (owner is not None and owner != pk):
+                errors.append(
+                    {
+                        "row": row_number,
+                        "error": UserImporter.get_exists_error(row_number, row),
+                    }
+                )
+                continue
+            user = User(user_id=user_id, organization=organization, **user_data)
+            if pk is None:
+                created_users.append((row_number, user))
+            else:
+                replaced_users.append((row_number, user))
+        if not write or not (created_users or replaced_users):
+            return 0, 0, errors
+
+        upserts = created_users + replaced_users
+        unhashed = [
+            (row_number, user.password)
+            for row_number, user in upserts
+            if row_number not in hashed_passwords
+        ]
+        hashed_passwords.update(
+            zip(
+                [row_number for row_number, _ in unhashed],
+                pool.map(make_password, [password for _, password in unhashed]),
+            )
+        )
+        for row_number, user in upserts:
+            user.password = hashed_passwords[row_number]
+        User.objects.bulk_create([user for _, user in created_users])
+        User.objects.bulk_create(
+            [user for _, user in replaced_users],
+            update_conflicts=True,
+            unique_fields=["organization_id", "user_id"],
+            update_fields=UPSERT_FIELDS,
+        )
+        # replacing deleted users brings their module activities back
+        if replaced_users:
+            ModuleActivityRollups.refresh_for_users(
+                [existing[user.user_id][0] for _, user in replaced_users]
+            )
+        AnalyticsCache.invalidate([organization.id])
+        return len(created_users), len(replaced_users), errors
+
+    def import_file(upload, organization, created_by, atomic=True, progress=None):
+        """
+        Imports the users of a CSV upload and returns the counts of rows
+        processed, created, updated and failed with the row errors. With
+        atomic, nothing is saved if any row fails; otherwise each chunk is
+        saved in its own transaction without its failed rows. progress, if
+        given, is called with the counts after each chunk. Raises
+        UserImportError when the upload cannot be imported at all.
+        """
+        result = {"processed": 0, "created": 0, "updated": 0, "failed": 0, "errors": []}
+        seen = {"user_ids": set(), "emails": set()}
+
+        def import_rows(rows, pool):
+            with transaction.atomic():
+                created, updated, errors = UserImporter.import_chunk(
+                    rows,
+                    organization,
+                    created_by,
+                    seen,
+                    pool,
+                    write=not (atomic and result["errors"]),
+                )
+            result["processed"] += len(rows)
+            result["created"] += created
+            result["updated"] += updated
+            result["failed"] += len(errors)
+            result["errors"].extend(errors)
+            if progress is not None:
+                progress(result)
+
+        # with atomic the chunks are savepoints of a single transaction
+        with transaction.atomic() if atomic else nullcontext(), ThreadPoolExecutor(
+            max_workers=settings.USER_IMPORT_HASH_WORKERS
+        ) as pool:
+            for rows in get_chunks(UserImporter.read_rows(upload, organization)):
+                import_rows(rows, pool)
+            if not result["processed"]:
+                raise UserImportError("Empty file found")
+            if atomic and result["errors"]:
+                transaction.set_rollback(True)
+                result["created"] = result["updated"] = 0
+        return result
+
+
+class UserUpdater:
+    """
+    Updates the users of an organization from the CSV of the update
+    template, IMPORT_CHUNK_SIZE rows at a time: the users of a chunk are
+    loaded with one query, the non blank values of each row converted and
+    validated by their model field, and only the users and columns that
+    changed written with bulk_update. Nothing is saved if any row fails.
+    """
+
+    def read_rows(upload, organization):
+        is_immertive = organization.name.lower() == "immertive"
+        reader = csv.reader(codecs.iterdecode(upload, "utf-8"), delimiter=",")
+        try:
+            headings = next(reader)
+        except StopIteration:
+            raise UserImportError("CSV file is empty or has no headers")
+        columns = [heading.lower().replace(" ", "_") for heading in headings]
+        if set(columns) != set(
+            IMMERTIVE_UPDATE_COLUMNS if is_immertive else UPDATE_COLUMNS
+        ):
+            raise UserImportError(HEADINGS_CHANGED_ERROR)
+
+        if is_immertive:
+            columns = [IMMERTIVE_COLUMNS.get(column, column) for column in columns]
+        for row_number, row in enumerate(reader, start=2):
+            yield row_number, dict(zip(columns, row))
+
+    def get_changes(row_number, row, user):
+        """
+        Returns {column: (current value, new value)} of the values of the row
+        that differ from the user's, or raises UserImportError.
+        """
+        changes = {}
+        for column, value in row.items():
+            if column == "user_id" or value == "":
+                continue
+            field = User._meta.get_field(column)
+            try:
+                value = field.clean(value, user)
+            except ValidationError as e:
+                raise UserImportError(
+                    "Invalid {} at row {}: {}".format(
+                        column.replace("_", " ").capitalize(),
+                        row_number,
+                        " ".join(e.messages),
+                    )
+                )
+            current = getattr(user, field.attname)
+            if current != value:
+                changes[column] = (current, value)
+        return changes
+
+    def update_chunk(rows, organization, write=True):
+        """
+        Returns (the changes of each changed row, row errors) of the rows
+        and, with write, saves the changes.
+        """
+        key = "mobile_no" if organization.name.lower() == "immertive" else "user_id"
+        users = {
+            user.user_id: user
+            for user in User.objects.filter(
+                organization=organization,
+                deleted=False,
+                user_id__in={row.get("user_id") for _, row in rows},
+            )
+        }
+        errors = []
+        changed_rows = []
+        changed_users = {}
+        for row_number, row in rows:
+            user_id = row.get("user_id")
+            if not user_id:
+                error = "Required field {} is missing at row {}".format(key, row_number)
+                errors.append({"row": row_number, "error": error})
+                continue
+            user = users.get(user_id)
+            if user is None:
+                error = "User with {} {} does not exist in the organization".format(
+                    key, user_id
+                )
+                errors.append({"row": row_number, "error": error})
+                continue
+            try:
+                changes = UserUpdater.get_changes(row_number, row, user)
+            except UserImportError as e:
+                errors.append({"row": row_number, "error": str(e)})
+                continue
+            if not changes:
+                continue
+            for column, (_, value) in changes.items():
+                setattr(user, column, value)
+            changed_users.setdefault(user.pk, (user, set()))[1].update(changes)
+            changed_rows.append(
+                {
+                    "row": row_number,
+                    "user_id": user_id,
+                    "changes": {
+                        column: {"from": current, "to": value}
+                        for column, (current, value) in changes.items()
+                    },
+                }
+            )
+        if not write:
+            return changed_rows, errors
+
+        # users changing the same columns are written together
+        users_by_columns = {}
+        for user, columns in changed_users.values():
+            users_by_columns.setdefault(frozenset(columns), []).append(user)
+        for columns, users in users_by_columns.items():
+            User.objects.bulk_update(users, sorted(columns))
+        return changed_rows, errors
+
+    def update_file(upload, organization):
+        """
+        Returns the counts of rows processed, updated, unchanged and failed,
+        the changes of each updated row and the row errors.
+        """
+        result = {
+            "processed": 0,
+            "updated": 0,
+            "unchanged": 0,
+            "failed": 0,
+            "changes": [],
+            "errors": [],
+        }
+        with transaction.atomic():
+            for rows in get_chunks(UserUpdater.read_rows(upload, organization)):
+                changed_rows, errors = UserUpdater.update_chunk(
+                    rows, organization, write=not result["errors"]
+                )
+                result["processed"] += len(rows)
+                result["updated"] += len(changed_rows)
+                result["unchanged"] += len(rows) - len(changed_rows) - len(errors)
+                result["failed"] += len(errors)
+                result["changes"].extend(changed_rows)
+                result["errors"].extend(errors)
+            if not result["processed"]:
+                raise UserImportError("Empty file found")
+            if result["errors"]:
+                transaction.set_rollback(True)
+                result["updated"] = 0
+                result["changes"] = []
+            elif result["updated"]:
+                AnalyticsCache.invalidate([organization.id])
+        return result
@@ -0,0 +1,24 @@
+# Generated by Django 4.1.3 on 2026-10-18 19:04
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # the index is built concurrently so users can still be written
+    atomic = False
+
+    dependencies = [
+        ("accounts", "0023_remove_user_age_user_date_of_birth"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="user",
+            index=models.Index(
+                condition=models.Q(("active", True), ("deleted", False)),
+                fields=["organization", "access_type"],
+                name="user_org_active_idx",
+            ),
+        ),
+    ]
@@ -187,6 +187,15 @@ class User(AbstractBaseUser, PermissionsMixin):
         unique_together = [
             ["organization", "user_id"],
         ]
+        indexes = [
+            # analytics only count the active, non deleted users of an
+            # organization
+            models.Index(
+                fields=["organization", "access_type"],
+                condition=models.Q(active=True, deleted=False),
+                name="user_org_active_idx",
+            ),
+        ]
 
 
 def get_default_my_date():
@@ -205,3 +214,43 @@ class PasswordResetToken(models.Model):
 
     def __str__(self):
         return str(self.token)
+
+
+class UserImportJob(models.Model):
+    """
+    CSV of users uploaded to import-users-from-csv/ with background, imported
+    by the import_users task. Rows that fail are skipped and listed in the
+    error report.
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (COMPLETED, "Completed"),
+        (FAILED, "Failed"),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE)
+    created_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    file = models.FileField(upload_to="user-imports/")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    processed = models.PositiveIntegerField(default=0)
+    created = models.PositiveIntegerField(default=0)
+    updated = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    # why the file as a whole could not be imported
+    error = models.TextField(blank=True)
+    # CSV of the rows that failed, with their errors
+    error_report = models.FileField(upload_to="user-import-errors/", blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.file.name} ({self.status})"
@@ -63,6 +63,9 @@ class UserSerializer(serializers.ModelSerializer):
 class CreateOrUpdateeUserFromCSVSerializer(serializers.Serializer):
     file = serializers.FileField(allow_empty_file=False)
     organization_id = serializers.IntegerField(required=True)
+    # imports with the import_users task, polled with
+    # import-users-from-csv/<job_id>/
+    background = serializers.BooleanField(default=False)
 
     def validate_file(self, value):
         if not value.name.endswith(".csv"):
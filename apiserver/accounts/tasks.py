@@ -0,0 +1,69 @@
+import csv
+import io
+import logging
+
+from celery import shared_task
+from django.core.files.base import ContentFile
+
+from accounts.importers import UserImporter, UserImportError
+from accounts.models import UserImportJob
+
+logger = logging.getLogger(__name__)
+
+
+# progress is tracked on UserImportJob itself, so no result is stored. Not
+# retried: the chunks imported before a failure are already committed
+@shared_task(ignore_result=True)
+def import_users(job_id):
+    job = UserImportJob.objects.select_related("organization", "created_by").get(
+        id=job_id
+    )
+    if job.status != UserImportJob.PENDING:
+        logger.info(f"user import {job_id} already {job.status}")
+        return
+    job.status = UserImportJob.RUNNING
+    job.save(update_fields=["status", "updated_at"])
+
+    def report_progress(result):
+        for field in ["processed", "created", "updated", "failed"]:
+            setattr(job, field, result[field])
+        job.save(
+            update_fields=["processed", "created", "updated", "failed", "updated_at"]
+        )
+
+    try:
+        with job.file.open("rb") as upload:
+            result = UserImporter.import_file(
+                upload,
+                job.organization,
+                job.created_by,
+                atomic=False,
+                progress=report_progress,
+            )
+    except UserImportError as e:
+        job.status = UserImportJob.FAILED
+        job.error = str(e)
+        job.save(update_fields=["status", "error", "updated_at"])
+        return
+    except Exception as e:
+        logger.exception(f"user import {job_id} failed")
+        job.status = UserImportJob.FAILED
+        job.error = f"{type(e).__name__}: {e}"
+        job.save(update_fields=["status", "error", "updated_at"])
+        return
+
+    if result["errors"]:
+        report = io.StringIO()
+        writer = csv.writer(report)
+        writer.writerow(["Row", "Error"])
+        for error in result["errors"]:
+            writer.writerow([error["row"], error["error"]])
+        job.error_report.save(
+            f"{job.id}.csv", ContentFile(report.getvalue().encode()), save=False
+        )
+    job.status = UserImportJob.COMPLETED
+    job.save(update_fields=["status", "error_report", "updated_at"])
+    logger.info(
+        f"user import {job_id} completed: {result['created']} created, "
+        f"{result['updated']} updated, {result['failed']} failed"
+    )
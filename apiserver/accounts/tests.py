@@ -1,3 +1,323 @@
-# from django.test import TestCase
+import gzip
+import io
+import tempfile
+from datetime import datetime
+from unittest import mock
 
-# Create your tests here.
+import pytz
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from openpyxl import load_workbook
+from rest_framework.test import APIClient
+
+from accounts.importers import UserImporter
+from accounts.models import User, UserImportJob
+from accounts.tasks import import_users
+from organizations.models import Organization
+
+HEADINGS = "First Name,Last Name,User Id,Designation,Department,Work Location,Password"
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class UserImportTests(TestCase):
+    def setUp(self):
+        tz = pytz.timezone("Asia/Kolkata")
+        self.organization = Organization.objects.create(
+            name="Warehouse",
+            slug="warehouse",
+            start_date=datetime(2024, 1, 1, tzinfo=tz),
+            end_date=datetime(2026, 12, 31, tzinfo=tz),
+        )
+        self.staff = User.objects.create(
+            email="admin@warehouse.com",
+            user_id="admin",
+            access_type="Admin",
+            organization=self.organization,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def upload(self, rows, **data):
+        content = "\n".join([HEADINGS, *rows]).encode()
+        return self.client.post(
+            "/api/v1/accounts/import-users-from-csv/",
+            {
+                "organization_id": self.organization.id,
+                "file": SimpleUploadedFile("users.csv", content),
+                **data,
+            },
+            format="multipart",
+        )
+
+    def test_import_creates_and_replaces_deleted_users(self):
+        deleted = User.objects.create(
+            email="old@warehouse.com",
+            user_id="u2",
+            first_name="Old",
+            organization=self.organization,
+            deleted=True,
+        )
+        response = self.upload(
+            [
+                "Asha,Rao,u1,Operator,Ops,Pune,secret1",
+                "Ravi,Kumar,u2,Operator,Ops,,secret2",
+            ]
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(response.data["updated"], 1)
+
+        replaced = User.objects.get(id=deleted.id)
+        self.assertFalse(replaced.deleted)
+        self.assertEqual(replaced.first_name, "Ravi")
+        self.assertEqual(replaced.email, "raviu2@warehouse.com")
+        self.assertTrue(replaced.check_password("secret2"))
+        self.assertEqual(replaced.created_by, self.staff)
+
+    def test_import_reports_every_row_error_and_saves_nothing(self):
+        User.objects.create(
+            email="taken@warehouse.com",
+            user_id="u1",
+            organization=self.organization,
+        )
+        response = self.upload(
+            [
+                "Asha,Rao,u1,Operator,Ops,Pune,secret1",
+                "Ravi,,u2,Operator,,Pune,secret2",
+                "Mina,Shah,u3,Operator,Ops,Pune,secret3",
+                "Mina,Shah,u3,Operator,Ops,Pune,secret3",
+            ]
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error["row"] for error in response.data["errors"]], [1, 2, 4])
+        self.assertEqual(
+            response.data["errors"][1]["error"],
+            "Required fields Last name and Department are missing at row 2",
+        )
+        self.assertEqual(response.data["processed"], 4)
+        self.assertFalse(User.objects.filter(user_id="u3").exists())
+
+    def test_import_does_not_overwrite_a_user_created_meanwhile(self):
+        active = User.objects.create(
+            email="asha@warehouse.com",
+            user_id="u1",
+            first_name="Asha",
+            organization=self.organization,
+        )
+        active.set_password("kept")
+        active.save()
+        get_existing = UserImporter.get_existing
+        reads = []
+
+        def read_before_creation(organization, user_ids, lock):
+            # the first read misses u1, as if it was created right after it
+            reads.append(user_ids)
+            if len(reads) == 1:
+                return {}
+            return get_existing(organization, user_ids, lock)
+
+        with mock.patch.object(
+            UserImporter, "get_existing", side_effect=read_before_creation
+        ):
+            response = self.upload(["Asha,Rao,u1,Operator,Ops,Pune,secret1"])
+        self.assertEqual(len(reads), 2)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error["row"] for error in response.data["errors"]], [1])
+        active.refresh_from_db()
+        self.assertTrue(active.check_password("kept"))
+        self.assertEqual(active.last_name, "")
+
+    @override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+    def test_background_import_skips_failed_rows_and_reports_them(self):
+        with mock.patch.object(import_users, "apply_async") as apply_async:
+            response = self.upload(
+                [
+                    "Asha,Rao,u1,Operator,Ops,Pune,secret1",
+                    "Ravi,,u2,Operator,Ops,Pune,secret2",
+                    "Mina,Shah,u3,Operator,Ops,Pune,secret3",
+                ],
+                background=True,
+            )
+        self.assertEqual(response.status_code, 202)
+        job_id = response.data["job_id"]
+        apply_async.assert_called_once_with((str(job_id),), retry=False)
+        self.assertEqual(
+            UserImportJob.objects.get(id=job_id).status, UserImportJob.PENDING
+        )
+
+        import_users(str(job_id))
+        url = f"/api/v1/accounts/import-users-from-csv/{job_id}/"
+        response = self.client.get(url)
+        self.assertEqual(response.data["status"], UserImportJob.COMPLETED)
+        self.assertEqual(response.data["processed"], 3)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual(response.data["failed"], 1)
+        self.assertEqual(
+            sorted(
+                User.objects.filter(user_id__startswith="u").values_list(
+                    "user_id", flat=True
+                )
+            ),
+            ["u1", "u3"],
+        )
+
+        response = self.client.get(response.data["error_report"])
+        self.assertEqual(
+            b"".join(response.streaming_content).decode().splitlines(),
+            ["Row,Error", "2,Required field Last name is missing at row 2"],
+        )
+
+
+class UserUpdateTests(TestCase):
+    def setUp(self):
+        tz = pytz.timezone("Asia/Kolkata")
+        self.organization = Organization.objects.create(
+            name="Warehouse",
+            slug="warehouse",
+            start_date=datetime(2024, 1, 1, tzinfo=tz),
+            end_date=datetime(2026, 12, 31, tzinfo=tz),
+        )
+        self.staff = User.objects.create(
+            email="admin@warehouse.com",
+            user_id="admin",
+            access_type="Admin",
+            organization=self.organization,
+        )
+        for index in range(6):
+            User.objects.create(
+                email=f"learner{index}@warehouse.com",
+                user_id=f"u{index}",
+                first_name="Learner",
+                designation="Operator",
+                department="Ops",
+                work_location="Pune",
+                organization=self.organization,
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def update(self, rows):
+        content = "\n".join(
+            ["User Id,Designation,Department,Work Location", *rows]
+        ).encode()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put(
+                "/api/v1/accounts/import-users-from-csv/",
+                {
+                    "organization_id": self.organization.id,
+                    "file": SimpleUploadedFile("users.csv", content),
+                },
+                format="multipart",
+            )
+        return response, len(queries)
+
+    def test_update_writes_only_changed_columns(self):
+        response, few_rows_queries = self.update(
+            ["u0,Supervisor,,", "u1,Operator,Ops,Pune"]
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["updated"], 1)
+        self.assertEqual(response.data["unchanged"], 1)
+        self.assertEqual(
+            response.data["changes"],
+            [
+                {
+                    "row": 2,
+                    "user_id": "u0",
+                    "changes": {
+                        "designation": {"from": "Operator", "to": "Supervisor"}
+                    },
+                }
+            ],
+        )
+        user = User.objects.get(user_id="u0")
+        self.assertEqual(user.designation, "Supervisor")
+        self.assertEqual(user.department, "Ops")
+
+        _, many_rows_queries = self.update(
+            [f"u{index},Lead,Ops,Mumbai" for index in range(6)]
+        )
+        self.assertEqual(few_rows_queries, many_rows_queries)
+        self.assertEqual(
+            User.objects.filter(designation="Lead", work_location="Mumbai").count(), 6
+        )
+
+    def test_update_reports_every_row_error_and_saves_nothing(self):
+        response, _ = self.update(
+            ["u0,Supervisor,,", ",Lead,,", "u9,Lead,,", "u1," + "x" * 101 + ",,"]
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [error["error"] for error in response.data["errors"]],
+            [
+                "Required field user_id is missing at row 3",
+                "User with user_id u9 does not exist in the organization",
+                "Invalid Designation at row 5: Ensure this value has at most 100 "
+                "characters (it has 101).",
+            ],
+        )
+        self.assertEqual(User.objects.get(user_id="u0").designation, "Operator")
+
+
+class DownloadListTests(TestCase):
+    def setUp(self):
+        tz = pytz.timezone("Asia/Kolkata")
+        self.organization = Organization.objects.create(
+            name="Warehouse",
+            slug="warehouse",
+            start_date=datetime(2024, 1, 1, tzinfo=tz),
+            end_date=datetime(2026, 12, 31, tzinfo=tz),
+        )
+        self.staff = User.objects.create(
+            email="admin@warehouse.com",
+            user_id="admin",
+            access_type="Admin",
+            organization=self.organization,
+        )
+        for index in range(3):
+            User.objects.create(
+                email=f"learner{index}@warehouse.com",
+                user_id=f"u{index}",
+                first_name="Learner",
+                department="Ops" if index else "Sales",
+                organization=self.organization,
+                deleted=index == 2,
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def download(self, **params):
+        return self.client.get(
+            "/api/v1/accounts/download-list/",
+            {"organization_id": self.organization.id, **params},
+        )
+
+    def test_download_streams_filtered_learners(self):
+        response = self.download(department="Ops")
+        self.assertEqual(
+            response["Content-Disposition"], "attachment; filename=Warehouse Users.csv"
+        )
+        self.assertEqual(
+            b"".join(response.streaming_content).decode().splitlines(),
+            [
+                "User Id,First Name,Last Name,Designation,Department,Work Location",
+                "u1,Learner,,,Ops,",
+            ],
+        )
+
+        response = self.download(gzip="true")
+        self.assertEqual(
+            gzip.decompress(b"".join(response.streaming_content)).decode().count("\n"),
+            3,
+        )
+
+    def test_download_xlsx(self):
+        response = self.download(file_format="xlsx")
+        self.assertEqual(response.status_code, 200)
+        sheet = load_workbook(io.BytesIO(b"".join(response.streaming_content))).active
+        self.assertEqual(
+            sorted(row[0] for row in sheet.iter_rows(min_row=2, values_only=True)),
+            ["u0", "u1"],
+        )
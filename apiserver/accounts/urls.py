@@ -2,6 +2,8 @@ from django.urls import path
 from .views import (
     DownloadTemplate,
     CreateUpdateUsersFromCSV,
+    UserImportJobView,
+    UserImportErrorsView,
     UsersView,
     UserProfileView,
     CreateUser,
@@ -33,6 +35,11 @@ urlpatterns = [
     path("create-user/", CreateUser.as_view()),
     path("update-user/<str:user_id>/", UpdateUserView.as_view()),
     path("import-users-from-csv/", CreateUpdateUsersFromCSV.as_view()),
+    path("import-users-from-csv/<uuid:job_id>/", UserImportJobView.as_view()),
+    path(
+        "import-users-from-csv/<uuid:job_id>/errors/",
+        UserImportErrorsView.as_view(),
+    ),
     path("list-users/", UsersView.as_view()),
     path("user-profile/<int:id>/", UserProfileView.as_view()),
     path("login/", AdminLoginView.as_view()),
@@ -1,10 +1,11 @@
 # from django.shortcuts import render
 
 # Create your views here.
+import logging
 from rest_framework.views import APIView
 from django.core.paginator import Paginator
 from django.http import JsonResponse
-from .models import User, PasswordResetToken
+from .models import User, PasswordResetToken, UserImportJob
 from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
@@ -12,7 +13,6 @@ from rest_framework import status
 from django.conf import settings
 from rest_framework import serializers
 from django.template.loader import render_to_string
-from django.contrib.auth.hashers import make_password
 from django.db import IntegrityError
 import pytz
 from .serializers import (
@@ -27,12 +27,10 @@ from .serializers import (
     UserLoginSerializer,
     ProfileUpdateSerializer,
     LearnersProfileSerializer,
-    CreateUserUsingCSVSerializer,
 )
-from django.http import HttpResponse
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 import csv
 from rest_framework.exceptions import PermissionDenied
-from django.db import transaction
 import re
 from django.utils import timezone
 from django.core.mail import send_mail
@@ -46,13 +44,19 @@ from rest_framework.generics import (
     RetrieveUpdateAPIView,
 )
 from rest_framework import generics, permissions
+from organizations.cache import AnalyticsCache
 from organizations.models import Organization
+from organizations.rollups import ModuleActivityRollups
 from accounts.utils import PasswordResetAuthentication
 from .filters import UsersFilter
+from .exports import UserExport, XLSX_CONTENT_TYPE
+from .importers import UserImporter, UserImportError, UserUpdater
+from .tasks import import_users
 from django.contrib.auth.hashers import check_password
-from datetime import datetime
 from django.db.models import Q
 
+logger = logging.getLogger(__name__)
+
 auth_backend = DashboardAuthenticationBackend()
 app_auth_backend = AppAuthenticationBackend()
 
@@ -156,6 +160,10 @@ class UsersDeleteView(APIView):
             return Response(status=400, data={"error": "No user were found for delete"})
         ids = [int(pk) for pk in pk_ids.split(",")]
         User.objects.filter(id__in=ids).update(active=False, deleted=True)
+        ModuleActivityRollups.refresh_for_users(ids)
+        AnalyticsCache.invalidate(
+            User.objects.filter(id__in=ids).values_list("organization_id", flat=True)
+        )
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -283,214 +291,46 @@ class CreateUpdateUsersFromCSV(APIView):
                     "error": "Given Organization does not exists. Please contact your organization admin"
                 },
             )
-        is_immertive = organization.name.lower() == "immertive"
-        if is_immertive:
-            actual_headings = [
-                "First Name",
-                "Last Name",
-                "Mobile No",
-                "Designation",
-                "Department",
-                "Work Location",
-                "Date of Birth",
-                "Gender",
-                "Course",
-                "Batch",
-                "Roll No",
-                "Institute",
-                "City",
-                "State",
-                "VR Lab",
-                "PIN",
-            ]
-        else:
-            actual_headings = [
-                "First Name",
-                "Last Name",
-                "User Id",
-                "Designation",
-                "Department",
-                "Work Location",
-                "Password",
-            ]
 
-        file = request.FILES["file"]
-        decoded_file = file.read().decode("utf-8").splitlines()
-        reader = csv.reader(decoded_file, delimiter=",")
-        start = 5 if is_immertive else 0
-        if is_immertive:
+        if serializer.validated_data["background"]:
+            job = UserImportJob.objects.create(
+                organization=organization,
+                created_by=self.request.user,
+                file=request.FILES["file"],
+            )
             try:
-                for _ in range(4):
-                    next(reader)
-            except StopIteration:
+                import_users.apply_async((str(job.id),), retry=False)
+            except Exception:
+                logger.exception(f"could not enqueue user import {job.id}")
+                job.status = UserImportJob.FAILED
+                job.error = "Could not queue the import"
+                job.save(update_fields=["status", "error", "updated_at"])
                 return Response(
-                    status=400,
-                    data={"error": "CSV file is empty or has no headers"},
+                    status=503, data={"error": "Could not queue the import"}
                 )
-        headings = next(reader)
-        transformed_headers = []
+            return Response(status=202, data={"job_id": job.id, "status": job.status})
 
-        for _, heading in enumerate(headings):
-            transformed_headers.append(heading.lower().replace(" ", "_"))
-        rows = list(reader)
-        if not rows:
+        try:
+            result = UserImporter.import_file(
+                request.FILES["file"], organization, self.request.user
+            )
+        except UserImportError as e:
+            return Response(status=400, data={"error": str(e)})
+        except IntegrityError:
+            # a user created by another request while importing
             return Response(
                 status=400,
-                data={"error": "Empty file found"},
+                data={"error": "Something went wrong. Please try again later."},
+            )
+        if result["errors"]:
+            return Response(
+                status=400,
+                data={"error": result["errors"][0]["error"], **result},
             )
 
-        with transaction.atomic():
-            if actual_headings != headings:
-                return Response(
-                    status=400,
-                    data={
-                        "error": "It looks like the headers in the CSV file have been changed. \
-                            Please make sure to use the original template and try again."
-                    },
-                )
-            for row_index, row in enumerate(rows, start=start):
-                if is_immertive:
-                    replacements = {"mobile_no": "user_id", "pin": "password"}
-                    transformed_headers = [
-                        replacements.get(item, item) for item in transformed_headers
-                    ]
-                transformed_data = dict(zip(transformed_headers, row))
-                user_creation_serializer = CreateUserUsingCSVSerializer(
-                    data=transformed_data
-                )
-                if not user_creation_serializer.is_valid():
-                    transaction.set_rollback(True)
-                    empty_column_names = list(user_creation_serializer.errors.keys())
-                    if is_immertive:
-                        if "user_id" in empty_column_names:
-                            user_id_index = empty_column_names.index("user_id")
-                            empty_column_names[user_id_index] = "mobile_no"
-                        if "password" in empty_column_names:
-                            password_index = empty_column_names.index("password")
-                            empty_column_names[password_index] = "pin"
-                    if len(empty_column_names) == 1:
-                        formatted_names = (
-                            empty_column_names[0].replace("_", " ").capitalize()
-                        )
-                    else:
-                        formatted_names = (
-                            ", ".join(
-                                [
-                                    field.replace("_", " ").capitalize()
-                                    for field in empty_column_names[:-1]
-                                ]
-                            )
-                            + f" and {empty_column_names[-1].replace('_', ' ').capitalize()}"
-                        )
-
-                    return Response(
-                        status=400,
-                        data={
-                            "error": "Required {} {} {} missing at row {}".format(
-                                "field" if len(empty_column_names) == 1 else "fields",
-                                formatted_names,
-                                "is" if len(empty_column_names) == 1 else "are",
-                                row_index + 1,
-                            ),
-                        },
-                    )
-                row = dict(zip(transformed_headers, row))
-                if "user_id" in row:
-                    key = "user_id"
-                else:
-                    key = "mobile_no"
-                    if key in row and not CreateUpdateUsersFromCSV.validate_mobile_no(
-                        row[key]
-                    ):
-                        transaction.set_rollback(True)
-                        return Response(
-                            status=400,
-                            data={
-                                "error": "Invalid mobile number at row {}".format(
-                                    row_index + 1
-                                )
-                            },
-                        )
-                if "gender" in row:
-                    gender = row.get("gender", None)
-                    if gender is None or gender == "":
-                        gender = "M"
-                else:
-                    gender = None
-
-                user_data = {
-                    "first_name": row["first_name"],
-                    "last_name": row["last_name"],
-                    "designation": row["designation"],
-                    "department": row["department"],
-                    "work_location": row["work_location"],
-                    "access_type": "Learner",
-                    "email": row["first_name"].lower()
-                    + str(row[key]).lower()
-                    + "@"
-                    + organization.name.replace(" ", "-").lower()
-                    + ".com",
-                    "date_of_birth": datetime.strptime(
-                        row["date_of_birth"], "%Y-%m-%d"
-                    ).date()
-                    if "date_of_birth" in row
-                    else None,
-                    "gender": gender,
-                    "course": row.get("course", None),
-                    "batch": row.get("batch", None),
-                    "roll_no": row.get("roll_no", None),
-                    "institute": row.get("institute", None),
-                    "city": row.get("city", None),
-                    "state": row.get("state", None),
-                    "vr_lab": row.get("vr_lab", None),
-                    "created_by": self.request.user,
-                    "password": make_password(row.get("pin", None))
-                    if "pin" in row
-                    else make_password(row.get("password", None)),
-                    "deleted": False,
-                    "active": True,
-                }
-                try:
-                    User.objects.update_or_create(
-                        user_id=row[key],
-                        organization=organization,
-                        deleted=True,
-                        defaults=user_data,
-                    )
-
-                except IntegrityError:
-                    transaction.set_rollback(True)
-                    return Response(
-                        status=400,
-                        data={
-                            "error": "The user with given {} {} at row {} for user {} already exists".format(
-                                " ".join(word.capitalize() for word in key.split("_")),
-                                row[key],
-                                row_index + 1,
-                                row["first_name"] + " " + row["last_name"],
-                            )
-                        },
-                    )
-
-                except ValueError:
-                    transaction.set_rollback(True)
-                    return Response(
-                        status=400,
-                        data={
-                            "error": "Invalid date format. Expected format: YYYY-MM-DD at row {}".format(
-                                row_index + 1
-                            )
-                        },
-                    )
-
-                except Exception:
-                    transaction.set_rollback(True)
-                    return Response(
-                        status=400,
-                        data={"error": "Something went wrong. Please try again later."},
-                    )
-
-        return Response(status=201, data={"message": "Users created successfully"})
+        return Response(
+            status=201, data={"message": "Users created successfully", **result}
+        )
 
     def put(self, request, format=None, **kwargs):
         serializer = self.serializer_class(data=request.data)
@@ -507,92 +347,65 @@ class CreateUpdateUsersFromCSV(APIView):
                 },
             )
 
-        is_immertive = organization.name.lower() == "immertive"
-        updatable_fields = ["user_id", "designation", "department", "work_location"]
-        if is_immertive:
-            updatable_fields.extend(
-                [
-                    "mobile_no",
-                    "designation",
-                    "department",
-                    "work_location",
-                    "course",
-                    "batch",
-                    "roll_no",
-                    "institute",
-                    "city",
-                    "state",
-                    "vr_lab",
-                ]
+        try:
+            result = UserUpdater.update_file(request.FILES["file"], organization)
+        except UserImportError as e:
+            return Response(status=400, data={"error": str(e)})
+        if result["errors"]:
+            return Response(
+                status=400,
+                data={"error": result["errors"][0]["error"], **result},
             )
-            updatable_fields.remove("user_id")
 
-        file = request.FILES["file"]
-        decoded_file = file.read().decode("utf-8").splitlines()
-        reader = csv.reader(decoded_file, delimiter=",")
+        return Response(
+            status=200, data={"message": "Users updated successfully", **result}
+        )
 
-        headings = next(reader)
-        transformed_headers = []
-        for _, heading in enumerate(headings):
-            transformed_headers.append(heading.lower().replace(" ", "_"))
 
-        rows = list(reader)
-        if not rows:
-            return Response(
-                status=400,
-                data={"error": "Empty file found"},
-            )
+class UserImportJobView(APIView):
+    permission_classes = [IsOrgOwnerOrStaff]
 
-        with transaction.atomic():
-            if set(updatable_fields) != set(transformed_headers):
-                return Response(
-                    status=400,
-                    data={
-                        "error": "It looks like the headers in the CSV file have been changed. \
-                            Please make sure to use the original template and try again."
-                    },
-                )
+    def get_job(request, job_id):
+        jobs = UserImportJob.objects.all()
+        if request.user.access_type != User.CUSMAT_ADMIN:
+            jobs = jobs.filter(organization_id=request.user.organization_id)
+        return jobs.filter(id=job_id).first()
 
-            for row_index, row in enumerate(rows, start=1):
-                if is_immertive:
-                    replacements = {"mobile_no": "user_id"}
-                    transformed_headers = [
-                        replacements.get(item, item) for item in transformed_headers
-                    ]
-                transformed_data = dict(zip(transformed_headers, row))
-                user_id = transformed_data.get("user_id")
-                if not user_id:
-                    return Response(
-                        status=400,
-                        data={
-                            "error": "Required field {} is missing at row {}".format(
-                                "mobile_no" if is_immertive else "user_id",
-                                row_index + 1,
-                            )
-                        },
-                    )
+    def get(self, request, job_id):
+        job = UserImportJobView.get_job(request, job_id)
+        if job is None:
+            return Response(status=404, data={"error": "Import not found"})
+        return Response(
+            status=200,
+            data={
+                "job_id": job.id,
+                "status": job.status,
+                "processed": job.processed,
+                "created": job.created,
+                "updated": job.updated,
+                "failed": job.failed,
+                "error": job.error,
+                "error_report": f"{request.path}errors/" if job.error_report else None,
+                "created_at": job.created_at,
+                "updated_at": job.updated_at,
+            },
+        )
 
-                try:
-                    user = User.objects.get(
-                        user_id=user_id, organization=organization, deleted=False
-                    )
-                except User.DoesNotExist:
-                    return Response(
-                        status=400,
-                        data={
-                            "error": "User with {} {} does not exist in the organization".format(
-                                "mobile_no" if is_immertive else "user_id", user_id
-                            )
-                        },
-                    )
-                for field in transformed_data:
-                    new_value = transformed_data[field]
-                    if new_value != "":
-                        user.__dict__[field] = new_value
 
-                user.save()
+# api to download the rows of an import that failed, with their errors
+class UserImportErrorsView(APIView):
+    permission_classes = [IsOrgOwnerOrStaff]
 
-        return Response(status=200, data={"message": "Users updated successfully"})
+    def get(self, request, job_id):
+        job = UserImportJobView.get_job(request, job_id)
+        if job is None or not job.error_report:
+            return Response(status=404, data={"error": "Error report not found"})
+        return FileResponse(
+            job.error_report.open("rb"),
+            as_attachment=True,
+            filename=f"import-errors-{job.id}.csv",
+            content_type="text/csv",
+        )
 
 
 class CreateUser(generics.CreateAPIView):
@@ -873,74 +686,48 @@ class DownloadListView(generics.GenericAPIView):
         return dict
 
     def get(self, request, *args, **kwargs):
-        organization_id = self.request.query_params.get("organization_id", None)
+        """
+        Streams the learners of the organization as CSV, gzipped with
+        gzip=true, or as an XLSX workbook with file_format=xlsx. Other query
+        params filter the users.
+        """
         query_params = dict(self.request.query_params)
         filtered_query_params = DownloadListView.convert_dict(query_params)
-        if organization_id is None:
+        file_format = filtered_query_params.pop("file_format", "csv")
+        compress = filtered_query_params.pop("gzip", "false").lower() == "true"
+        if file_format not in ["csv", "xlsx"]:
+            return Response(
+                status=400, data={"error": "file_format must be csv or xlsx"}
+            )
+        organization_id = filtered_query_params.get("organization_id", None)
+        organization = (
+            organization_id and Organization.objects.filter(id=organization_id).first()
+        )
+        if not organization:
             return Response(status=400, data={"error": "No users found"})
+        headers, fields = UserExport.get_columns(organization)
         organization_users = User.objects.filter(
             access_type="Learner", deleted=False, active=True, **filtered_query_params
         )
-        is_immertive = organization_users[0].organization.name.lower() == "immertive"
-        if is_immertive:
-            headers = [
-                "Mobile No",
-                "First Name",
-                "Last Name",
-                "Designation",
-                "Department",
-                "Work Location",
-                "Date of Birth",
-                "Gender",
-                "Course",
-                "Batch",
-                "Roll No.",
-                "Institute",
-                "City",
-                "State",
-                "VR Lab",
-            ]
+        rows = UserExport.get_rows(organization_users, fields)
+        filename = str(organization) + " Users"
+        if file_format == "xlsx":
+            return FileResponse(
+                UserExport.write_xlsx(rows, headers),
+                as_attachment=True,
+                filename=filename + ".xlsx",
+                content_type=XLSX_CONTENT_TYPE,
+            )
+        content = UserExport.iter_csv(rows, headers)
+        if compress:
+            response = StreamingHttpResponse(
+                UserExport.gzip(content), content_type="application/gzip"
+            )
+            filename += ".csv.gz"
         else:
-            headers = [
-                "User Id",
-                "First Name",
-                "Last Name",
-                "Designation",
-                "Department",
-                "Work Location",
-            ]
-        filename = str(request.user.organization) + " Users.csv"
-        response = HttpResponse(
-            content_type="text/csv",
-            headers={"Content-Disposition": "attachment; filename={}".format(filename)},
-        )
-        writer = csv.writer(response)
-        writer.writerow(headers)
-        for organization_user in organization_users:
-            data = [
-                organization_user.user_id,
-                organization_user.first_name,
-                organization_user.last_name,
-                organization_user.designation,
-                organization_user.department,
-                organization_user.work_location,
-            ]
-            if is_immertive:
-                data.extend(
-                    [
-                        organization_user.date_of_birth,
-                        organization_user.gender,
-                        organization_user.course,
-                        organization_user.batch,
-                        organization_user.roll_no,
-                        organization_user.institute,
-                        organization_user.city,
-                        organization_user.state,
-                        organization_user.vr_lab,
-                    ]
-                )
-            writer.writerow(data)
-
+            response = StreamingHttpResponse(content, content_type="text/csv")
+            filename += ".csv"
+        response["Content-Disposition"] = "attachment; filename={}".format(filename)
         return response
 
 
@@ -42,6 +42,7 @@ CORS_ALLOW_HEADERS = [
     "x-csrftoken",
     "x-requested-with",
     "password-reset-token",
+    "idempotency-key",
 ]
 
 # Auto-created primary key used when not defining a primary key type
@@ -196,6 +197,22 @@ CACHES = {
     }
 }
 
+# dashboard analytics cached by organizations/cache.py, in seconds. Entries
+# older than the soft TTL, or of an organization changed since, are served
+# while a task refreshes them; entries older than the hard TTL are recomputed
+ANALYTICS_CACHE_SOFT_TTL = 60 * 5
+ANALYTICS_CACHE_HARD_TTL = 60 * 60
+# longest an entry is expected to take to compute, and how long requests
+# wait for another one computing the entry before computing it themselves
+ANALYTICS_CACHE_LOCK_TIMEOUT = 60
+ANALYTICS_CACHE_LOCK_WAIT = 10
+# endpoints computed on every request, e.g. ["calculate-performances"]
+ANALYTICS_CACHE_DISABLED = []
+
+# threads hashing the passwords of users imported from CSV, PBKDF2 releases
+# the GIL so they run on separate cores
+USER_IMPORT_HASH_WORKERS = os.cpu_count() or 1
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(hours=1),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
@@ -304,6 +321,12 @@ CELERY_ACCEPT_CONTENT = ["application/json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = "UTC"
+CELERY_BEAT_SCHEDULE = {
+    "requeue-pending-attempt-ingests": {
+        "task": "organizations.tasks.requeue_pending_attempt_ingests",
+        "schedule": 300.0,
+    },
+}
 
 # Celery Settings - Move to localsettings on Production Environment
 # CELERY_BROKER_URL = "redis://localhost:6379"
@@ -9,6 +9,9 @@ from .models import (
     LevelActivity,
     Attempt,
     UserActivity,
+    ModuleActivityRollup,
+    DailyApplicationUsage,
+    AttemptIngest,
 )
 from django.utils.translation import gettext_lazy as _
 from django.contrib.admin import FieldListFilter
@@ -168,3 +171,45 @@ class UserActivityAdmin(admin.ModelAdmin):
         if obj.user and obj.user.organization:
             return obj.user.organization.name
         return None
+
+
+@admin.register(ModuleActivityRollup)
+class ModuleActivityRollupAdmin(admin.ModelAdmin):
+    list_display = [
+        "organization",
+        "module",
+        "month",
+        "assigned",
+        "active",
+        "completed",
+    ]
+    list_filter = ["organization", "module"]
+
+
+@admin.register(DailyApplicationUsage)
+class DailyApplicationUsageAdmin(admin.ModelAdmin):
+    list_display = [
+        "organization",
+        "module",
+        "user",
+        "day",
+        "total_duration",
+        "sessions",
+    ]
+    list_filter = ["organization", "module"]
+
+
+@admin.register(AttemptIngest)
+class AttemptIngestAdmin(admin.ModelAdmin):
+    list_display = [
+        "id",
+        "idempotency_key",
+        "status",
+        "attempt",
+        "retries",
+        "created_at",
+        "updated_at",
+    ]
+    list_filter = ["status"]
+    search_fields = ["idempotency_key"]
+    raw_id_fields = ["attempt"]
@@ -4,3 +4,25 @@ from django.apps import AppConfig
 class OrganizationsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "organizations"
+
+    def ready(self):
+        from organizations import signals  # noqa
+        from organizations import views
+        from organizations.cache import AnalyticsCache
+
+        # registered once the app is ready, so every process has them,
+        # including the Celery workers refreshing entries
+        for name, compute in [
+            ("calculate-performances", views.PerformanceView.get_performance),
+            ("level-wise-analytics", views.LevelActivityApiView.get_level_analytics),
+            ("application-usage", views.ApplicationUsageApiView.get_usage),
+            (
+                "application-usage-analytics",
+                views.ApplicationUsageAnalyticsAPIView.get_analytics,
+            ),
+            (
+                "total-active-module-and-users",
+                views.TotalActiveModuleAndUsersAPIView.get_totals,
+            ),
+        ]:
+            AnalyticsCache.register(name)(compute)
@@ -0,0 +1,106 @@
+from django.db import connection, transaction
+from django.utils import timezone
+
+from accounts.models import User
+from organizations.cache import AnalyticsCache
+from organizations.models import ModuleActivity, ModuleAttributes
+from organizations.rollups import ModuleActivityRollups
+
+# module activities inserted per statement, and between progress reports
+ASSIGNMENT_CHUNK_SIZE = 1000
+
+
+class ModuleAssignments:
+    """
+    Assigns and de-assigns modules to users in bulk. The ModuleActivity
+    signals do not fire for bulk_create and update(), so the rollups and the
+    analytics cache are refreshed here, once per call.
+    """
+
+    def get_missing_pairs(user_ids, module_ids):
+        """
+        (user id, module attribute id) of every existing user and module in
+        the ids without an active module activity, ordered by module.
+        """
+        quote_name = connection.ops.quote_name
+        users = quote_name(User._meta.db_table)
+        modules = quote_name(ModuleAttributes._meta.db_table)
+        module_activities = quote_name(ModuleActivity._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT u.id, m.id
+                FROM {users} u CROSS JOIN {modules} m
+                WHERE u.id = ANY(%s) AND m.id = ANY(%s) AND NOT EXISTS (
+                    SELECT 1 FROM {module_activities} a
+                    WHERE a.user_id = u.id AND a.module_id = m.id AND a.active
+                )
+                ORDER BY m.id, u.id
+                """,
+                [list(user_ids), list(module_ids)],
+            )
+            return cursor.fetchall()
+
+    def assign(user_ids, module_ids, progress=None):
+        """
+        Creates the missing active module activities in one transaction,
+        calling progress(processed, total) after each chunk. Returns the
+        number created.
+        """
+        with transaction.atomic():
+            pairs = ModuleAssignments.get_missing_pairs(user_ids, module_ids)
+            assigned_on = timezone.now()
+            for start in range(0, len(pairs), ASSIGNMENT_CHUNK_SIZE):
+                end = start + ASSIGNMENT_CHUNK_SIZE
+                chunk = pairs[start:end]
+                ModuleActivity.objects.bulk_create(
+                    ModuleActivity(
+                        user_id=user_id,
+                        module_id=module_id,
+                        assigned_on=assigned_on,
+                        active=True,
+                    )
+                    for user_id, module_id in chunk
+                )
+                if progress is not None:
+                    progress(start + len(chunk), len(pairs))
+
+            assigned_modules = {module_id for _, module_id in pairs}
+            month = ModuleActivityRollups.get_month(assigned_on)
+            ModuleActivityRollups.refresh(
+                {(module_id, month) for module_id in assigned_modules}
+            )
+            ModuleAssignments.invalidate(assigned_modules)
+        return len(pairs)
+
+    def deassign(user_ids, module_ids, progress=None):
+        """
+        Deactivates the active module activities of the users for the
+        modules with one update. Returns the number deactivated.
+        """
+        with transaction.atomic():
+            module_activities = ModuleActivity.objects.filter(
+                user_id__in=user_ids, module_id__in=module_ids, active=True
+            )
+            buckets = set()
+            for module_id, assigned_on, complete_date in module_activities.values_list(
+                "module_id", "assigned_on", "complete_date"
+            ).select_for_update():
+                buckets |= ModuleActivityRollups.get_buckets(
+                    module_id, assigned_on, complete_date
+                )
+            deassigned = module_activities.update(active=False)
+
+            ModuleActivityRollups.refresh(buckets)
+            ModuleAssignments.invalidate({module_id for module_id, _ in buckets})
+        if progress is not None:
+            progress(deassigned, deassigned)
+        return deassigned
+
+    def invalidate(module_ids):
+        if module_ids:
+            AnalyticsCache.invalidate(
+                ModuleAttributes.objects.filter(id__in=module_ids).values_list(
+                    "organization_id", flat=True
+                )
+            )
@@ -0,0 +1,209 @@
+import hashlib
+import json
+import logging
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# version scope of the endpoints computed across organizations, bumped on
+# every change
+ALL_ORGANIZATIONS = "all"
+# how often a request waiting for another one to compute an entry checks it
+COALESCE_POLL_SECONDS = 0.05
+METRIC_KINDS = ("hits", "stale", "misses", "coalesced")
+
+
+class AnalyticsCache:
+    """
+    Caches the dashboard analytics computed by the functions registered with
+    AnalyticsCache.register, in OrganizationsConfig.ready.
+
+    Each entry records the version of its organization, bumped on commit
+    whenever attempts, module activities or user activities of the
+    organization change. An entry of an older version, or older than
+    ANALYTICS_CACHE_SOFT_TTL, is still served while the refresh_analytics
+    task recomputes it; entries are dropped after ANALYTICS_CACHE_HARD_TTL.
+    Only one process computes an entry at a time, the requests missing it
+    meanwhile wait for its result.
+    """
+
+    computations = {}
+
+    def register(name):
+        def decorator(compute):
+            AnalyticsCache.computations[name] = compute
+            return compute
+
+        return decorator
+
+    def is_enabled(name):
+        return name not in settings.ANALYTICS_CACHE_DISABLED
+
+    def get_scope(organization_id):
+        return ALL_ORGANIZATIONS if organization_id is None else str(organization_id)
+
+    def get_version(scope):
+        key = f"analytics:version:{scope}"
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, 1, timeout=None)
+            version = cache.get(key, 1)
+        return version
+
+    def get_key(name, params):
+        scope = AnalyticsCache.get_scope(params.get("organization_id"))
+        digest = hashlib.md5(
+            json.dumps(params, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        return f"analytics:{name}:{scope}:{digest}"
+
+    def get(name, **params):
+        """
+        Returns the cached result of the computation registered as name for
+        these params. The params are passed to the computation and must be
+        JSON serializable, as the refresh task receives them too.
+        """
+        compute = AnalyticsCache.computations[name]
+        if not AnalyticsCache.is_enabled(name):
+            return compute(**params)
+
+        version = AnalyticsCache.get_version(
+            AnalyticsCache.get_scope(params.get("organization_id"))
+        )
+        entry = cache.get(AnalyticsCache.get_key(name, params))
+        if entry is None:
+            AnalyticsCache.count(name, "misses")
+            return AnalyticsCache.compute(name, params, wait=True)
+        if entry["version"] == version and entry["fresh_until"] > time.time():
+            AnalyticsCache.count(name, "hits")
+            return entry["data"]
+
+        AnalyticsCache.count(name, "stale")
+        if not AnalyticsCache.schedule_refresh(name, params):
+            data = AnalyticsCache.compute(name, params, wait=False)
+            if data is not None:
+                return data
+        return entry["data"]
+
+    def compute(name, params, wait):
+        """
+        Computes and stores the entry unless another process is already
+        computing it. Then, with wait, returns the entry that process stores,
+        or computes it anyway after ANALYTICS_CACHE_LOCK_WAIT seconds; without
+        wait returns None.
+        """
+        key = AnalyticsCache.get_key(name, params)
+        lock_key = f"{key}:lock"
+        token = uuid.uuid4().hex
+        if cache.add(lock_key, token, timeout=settings.ANALYTICS_CACHE_LOCK_TIMEOUT):
+            try:
+                return AnalyticsCache.store(name, params)
+            finally:
+                if cache.get(lock_key) == token:
+                    cache.delete(lock_key)
+        if not wait:
+            return None
+
+        AnalyticsCache.count(name, "coalesced")
+        deadline = time.monotonic() + settings.ANALYTICS_CACHE_LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(COALESCE_POLL_SECONDS)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry["data"]
+        logger.warning(f"gave up waiting for analytics {key}, computing it")
+        return AnalyticsCache.store(name, params)
+
+    def store(name, params):
+        # the version is read first, a change made while computing leaves
+        # the entry stale
+        version = AnalyticsCache.get_version(
+            AnalyticsCache.get_scope(params.get("organization_id"))
+        )
+        data = AnalyticsCache.computations[name](**params)
+        cache.set(
+            AnalyticsCache.get_key(name, params),
+            {
+                "version": version,
+                "fresh_until": time.time() + settings.ANALYTICS_CACHE_SOFT_TTL,
+                "data": data,
+            },
+            timeout=settings.ANALYTICS_CACHE_HARD_TTL,
+        )
+        return data
+
+    def schedule_refresh(name, params):
+        """
+        Queues one refresh_analytics task per stale entry. Returns False when
+        the task could not be queued.
+        """
+        # tasks imports the ingestion, which imports this module
+        from organizations.tasks import refresh_analytics
+
+        refresh_key = f"{AnalyticsCache.get_key(name, params)}:refresh"
+        if not cache.add(refresh_key, 1, timeout=settings.ANALYTICS_CACHE_LOCK_TIMEOUT):
+            return True
+        try:
+            refresh_analytics.apply_async((name, params), retry=False)
+        except Exception:
+            logger.exception(f"could not enqueue refresh of analytics {name}")
+            cache.delete(refresh_key)
+            return False
+        return True
+
+    def refresh(name, params):
+        AnalyticsCache.compute(name, params, wait=False)
+        cache.delete(f"{AnalyticsCache.get_key(name, params)}:refresh")
+
+    def increment(key):
+        try:
+            return cache.incr(key)
+        except ValueError:
+            if cache.add(key, 1, timeout=None):
+                return 1
+            return cache.incr(key)
+
+    def count(name, kind):
+        try:
+            AnalyticsCache.increment(f"analytics:metrics:{name}:{kind}")
+        except Exception:
+            logger.exception(f"could not count analytics cache {kind} of {name}")
+
+    def invalidate(organization_ids):
+        """
+        Bumps the versions of the organizations, and of the endpoints across
+        organizations, once the current transaction commits.
+        """
+        scopes = {
+            AnalyticsCache.get_scope(organization_id)
+            for organization_id in organization_ids
+        }
+        scopes.add(ALL_ORGANIZATIONS)
+
+        def bump():
+            for scope in scopes:
+                AnalyticsCache.increment(f"analytics:version:{scope}")
+
+        transaction.on_commit(bump)
+
+    def get_metrics():
+        metrics = []
+        for name in sorted(AnalyticsCache.computations):
+            keys = {kind: f"analytics:metrics:{name}:{kind}" for kind in METRIC_KINDS}
+            counts = cache.get_many(keys.values())
+            metric = {kind: counts.get(key, 0) for kind, key in keys.items()}
+            requests = metric["hits"] + metric["stale"] + metric["misses"]
+            metric["hit_rate"] = (
+                round((metric["hits"] + metric["stale"]) / requests * 100, 2)
+                if requests
+                else 0
+            )
+            metrics.append(
+                {"endpoint": name, "enabled": AnalyticsCache.is_enabled(name), **metric}
+            )
+        return metrics
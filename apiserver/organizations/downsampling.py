@@ -0,0 +1,142 @@
+import numpy as np
+
+# vehicleData samples are kept one per bucket of this many seconds
+PATH_BUCKET_SECONDS = 2
+# minimum gap between two plotted points of a line graph, in seconds
+GRAPH_SPACING_SECONDS = 2
+DECIMATION_METHODS = ("lttb", "minmax")
+
+
+class Downsampling:
+    """
+    NumPy helpers thinning the time series of an attempt before they are
+    rendered by AttemptSerializer. Selections are returned as indices so
+    the caller keeps the original records and any fields plotted alongside.
+    """
+
+    def round_2(values):
+        """
+        Rounds to 2 decimals exactly like round(value, 2). np.round scales by
+        100 and can fall on the other side of a tie, so the few values that
+        are close to one are rounded again with round().
+        """
+        values = np.asarray(values, dtype=float)
+        rounded = np.round(values, 2)
+        scaled = values * 100
+        for index in np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6):
+            rounded[index] = round(float(values[index]), 2)
+        return rounded
+
+    def group_path_points(points):
+        """
+        Groups vehicleData points by lower-cased path name, keeping the first
+        point of each 2 second bucket of a path, in their original order.
+        """
+        if not points:
+            return {}
+        codes = {}
+        keys = []
+        for point in points:
+            key = point["path"].lower() if point["path"] else "unknown"
+            keys.append(key)
+            codes.setdefault(key, len(codes))
+        times = np.asarray([point["time"] for point in points], dtype=float)
+        # np.rint rounds half to even, like round()
+        buckets = np.rint(times / PATH_BUCKET_SECONDS) * PATH_BUCKET_SECONDS
+        pairs = np.column_stack(
+            (np.asarray([codes[key] for key in keys], dtype=float), buckets)
+        )
+        _, first_indices = np.unique(pairs, axis=0, return_index=True)
+        paths = {}
+        for index in np.sort(first_indices):
+            paths.setdefault(keys[index], []).append(points[index])
+        return paths
+
+    def spaced_indices(times, spacing=GRAPH_SPACING_SECONDS):
+        """
+        Indices of the points kept when walking the series and keeping a
+        point once it is `spacing` after the last kept one. Sorted series
+        jump from kept point to kept point with a binary search.
+        """
+        times = np.asarray(times, dtype=float)
+        if len(times) == 0:
+            return np.asarray([], dtype=int)
+        if np.any(np.diff(times) < 0):
+            indices = [0]
+            for index in range(1, len(times)):
+                if times[index] - times[indices[-1]] >= spacing:
+                    indices.append(index)
+            return np.asarray(indices, dtype=int)
+
+        indices = [0]
+        while True:
+            last = indices[-1]
+            index = int(np.searchsorted(times, times[last] + spacing, side="left"))
+            # the search adds the spacing while the walk subtracts, which
+            # can round differently, so the bound is settled by subtracting
+            while index < len(times) and times[index] - times[last] < spacing:
+                index += 1
+            while index - 1 > last and times[index - 1] - times[last] >= spacing:
+                index -= 1
+            if index >= len(times):
+                return np.asarray(indices, dtype=int)
+            indices.append(index)
+
+    def lttb_indices(x, y, max_points):
+        """
+        Largest-Triangle-Three-Buckets: keeps the first and last points and,
+        from each bucket in between, the point forming the largest triangle
+        with the previous kept point and the average of the next bucket.
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        count = len(x)
+        if max_points >= count or max_points < 3:
+            return np.arange(count)
+        every = (count - 2) / (max_points - 2)
+        indices = [0]
+        for bucket in range(max_points - 2):
+            start = int(bucket * every) + 1
+            end = int((bucket + 1) * every) + 1
+            next_end = min(int((bucket + 2) * every) + 1, count)
+            if end < next_end:
+                average_x = x[end:next_end].mean()
+                average_y = y[end:next_end].mean()
+            else:
+                average_x, average_y = x[count - 1], y[count - 1]
+            previous = indices[-1]
+            areas = np.abs(
+                (x[previous] - average_x) * (y[start:end] - y[previous])
+                - (x[previous] - x[start:end]) * (average_y - y[previous])
+            )
+            indices.append(start + int(np.argmax(areas)))
+        indices.append(count - 1)
+        return np.asarray(indices, dtype=int)
+
+    def minmax_indices(x, y, max_points):
+        """
+        Keeps the first and last points and the lowest and highest point of
+        each of (max_points - 2) / 2 equal buckets, in order.
+        """
+        y = np.asarray(y, dtype=float)
+        count = len(y)
+        if max_points >= count or max_points < 4:
+            return np.arange(count)
+        edges = np.linspace(0, count, (max_points - 2) // 2 + 1).astype(int)
+        indices = {0, count - 1}
+        for start, end in zip(edges[:-1], edges[1:]):
+            if end > start:
+                indices.add(start + int(np.argmin(y[start:end])))
+                indices.add(start + int(np.argmax(y[start:end])))
+        return np.asarray(sorted(indices), dtype=int)
+
+    def decimate(x, y, max_points, method="lttb"):
+        """
+        Indices of at most max_points points of the series, all of them when
+        max_points is not set.
+        """
+        if not max_points or len(x) <= max_points:
+            return np.arange(len(x))
+        if method == "minmax":
+            return Downsampling.minmax_indices(x, y, max_points)
+        return Downsampling.lttb_indices(x, y, max_points)
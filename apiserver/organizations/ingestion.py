@@ -0,0 +1,785 @@
+import logging
+from collections import Counter
+from datetime import datetime
+
+import pytz
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.db import connection, transaction
+from django.db.models import Count, Max
+from django.db.models.functions import Lower
+
+from accounts.models import User
+from organizations.cache import AnalyticsCache
+from organizations.models import (
+    Attempt,
+    AttemptMistake,
+    AttemptTelemetry,
+    Category,
+    Level,
+    LevelActivity,
+    Module,
+    ModuleActivity,
+    ModuleAttributes,
+    UserActivity,
+)
+from organizations.rollups import ApplicationUsageCube, ModuleActivityRollups
+from organizations.telemetry import AttemptTelemetries
+
+logger = logging.getLogger(__name__)
+
+# modules scored by the server from the game data instead of the headset
+SCORED_MODULES = ["reach truck", "forklift"]
+
+
+class AttemptIngestion:
+    """
+    Records an attempt payload sent by the VR headset: scores it, creates the
+    Attempt, updates level and module completion and logs the UserActivity.
+
+    Used directly by UserAttemptView and by the process_attempt_ingest task
+    for payloads accepted through UserAttemptIngestView.
+    """
+
+    def get_score(data):
+        """
+        Scores forklift and reach truck attempts from the game data, out of
+        100. Other modules report their own score.
+        """
+        score = 0
+        free_score_kpi = {"Choose to turn off the unit before get out of the MHE": 2}
+        if (
+            "gameData" in data
+            and "inspections" in data["gameData"]
+            and data["gameData"]["inspections"]
+        ):
+            score_kpis = data["gameData"]["inspections"][0].get("actualFlow", [])
+        else:
+            score_kpis = []
+        for score_kpi in score_kpis:
+            if score_kpi in free_score_kpi:
+                score = score + free_score_kpi[score_kpi]
+
+        fixed_table_kpis = {
+            "brake condition": 2,
+            "fork condition": 2,
+            "alert light condition": 1,
+            "camera condition": 1,
+            "tilt condition": 2,
+            "steer condition": 2,
+            "safety belt condition": 1,
+            "fire extiguisher condition": 1,
+            "rearviews mirror condition": 1,
+            "blue light condition": 1,
+            "horn condition": 1,
+            "main light condition": 2,
+        }
+
+        if not data["gameData"]["tableKpis"]:
+            score = score + sum(fixed_table_kpis.values())
+        else:
+            for table_kpi in data["gameData"]["tableKpis"]:
+                if (
+                    "preCheckCondition" in table_kpi
+                    and table_kpi["preCheckCondition"].strip().lower()
+                    in fixed_table_kpis
+                    and table_kpi["hasChecked"] is True
+                ):
+                    score = (
+                        score
+                        + fixed_table_kpis[
+                            table_kpi["preCheckCondition"].strip().lower()
+                        ]
+                    )
+
+        fixed_mistakes = {
+            "did not complete pre operation check": 2,
+            "drove over the speed limit": 3,
+            "engagement error": 2,
+            "did not lower forks after stacking": 2,
+            "did not horn while pedestrian in vicinity": 2,
+            "did not horn before starting the engine": 1,
+            "did not horn before moving forward": 1,
+            "did not horn before moving in reverse": 1,
+            "did not press horn when turning into aisles": 1,
+            "fork blending occured": 3,
+            "did not maintain forkheight above 15 cm": 1,
+            "stacking error": 3,
+            "did not fix the pallet postion": 2,
+            "did not report breakdown during pre ops check": 2,
+        }
+        if "mistakes" in data["gameData"]:
+            score = score + sum(fixed_mistakes.values())
+            for mistake in data["gameData"]["mistakes"]:
+                if mistake["name"].strip().lower() in fixed_mistakes:
+                    score = score - fixed_mistakes[mistake["name"].strip().lower()]
+
+        if "path" in data["gameData"]:
+            ideal_total_time = 0
+            for ideal_time in data["gameData"]["path"]["idealTime"]:
+                ideal_total_time = ideal_total_time + ideal_time["timeTaken"]
+
+            actual_total_time = 0
+            actual_paths = {}
+            for actual_path in data["gameData"]["path"]["vehicleData"]:
+                if actual_path["path"].lower() != "path-1":
+                    if actual_path["path"].lower() not in actual_paths:
+                        actual_paths[actual_path["path"].lower()] = []
+                    actual_paths[actual_path["path"].lower()].append(actual_path)
+
+            for path in actual_paths:
+                first = actual_paths[path][0]["time"]
+                last = actual_paths[path][len(actual_paths[path]) - 1]["time"]
+                actual_total_time = actual_total_time + (last - first)
+
+            diff = actual_total_time - ideal_total_time
+            ideal_10 = ideal_total_time * 10 / 100
+            if diff > 0 and diff > ideal_10:
+                score = score + 5
+
+        score = score / 50 * 100
+        return score
+
+    def get_level_complete(module, module_name, score):
+        """
+        Returns whether the attempt completes its level, or None when the
+        attempt has no score and leaves the level as it is.
+        """
+        if score is None:
+            return None
+        if module_name.lower() == "forklift":
+            return True
+        if module.passing_score and float(score) < float(module.passing_score):
+            return False
+        return True
+
+    def get_summary(data, module, complete):
+        """
+        Summary columns stored on the Attempt so reports can aggregate them in
+        SQL. `passed` is the headset's own flag when sent, otherwise whether
+        the attempt completes its level.
+        """
+        score = data.get("score", None)
+        try:
+            score = float(score) if score is not None else None
+        except (TypeError, ValueError):
+            score = None
+        game_data = data.get("gameData", None)
+        mistakes = game_data.get("mistakes") if isinstance(game_data, dict) else None
+        passed = data.get("passed", None)
+        return {
+            "module": module,
+            "organization_id": module.organization_id,
+            "score": score,
+            "mistake_count": len(mistakes) if isinstance(mistakes, list) else 0,
+            "passed": passed if isinstance(passed, bool) else complete,
+        }
+
+    def get_mistakes(attempt, data, user_id):
+        """
+        AttemptMistake rows for the gameData.mistakes of a created attempt, in
+        the order the headset reported them.
+        """
+        game_data = data.get("gameData", None)
+        mistakes = game_data.get("mistakes") if isinstance(game_data, dict) else None
+        if not isinstance(mistakes, list):
+            return []
+        rows = []
+        for position, mistake in enumerate(mistakes):
+            if not isinstance(mistake, dict) or not mistake.get("name"):
+                continue
+            count = mistake.get("count", 1)
+            rows.append(
+                AttemptMistake(
+                    attempt=attempt,
+                    module_id=attempt.module_id,
+                    user_id=user_id,
+                    organization_id=attempt.organization_id,
+                    name=str(mistake["name"])[:255],
+                    count=count if isinstance(count, int) and count >= 0 else 1,
+                    position=position,
+                    timestamp=attempt.end_time,
+                )
+            )
+        return rows
+
+    def get_category(name):
+        try:
+            category = Category.objects.get(name__iexact=name)
+        except Category.DoesNotExist:
+            last_category = Category.objects.order_by("-order").last()
+            category_order = last_category.order + 1 if last_category else 1
+            category = Category(name=name.capitalize(), order=category_order)
+            category.save()
+        return category
+
+    def get_level(module, level_name, category):
+        all_levels = Level.objects.filter(module=module)
+        logger.info("all levels fetched for the module")
+        try:
+            level_obj = all_levels.get(name__iexact=level_name)
+            level_obj.category = category
+            level_obj.save()
+        except Level.DoesNotExist:
+            last_level = Level.objects.filter(module=module).order_by("level").last()
+            level_number = last_level.level + 1 if last_level else 1
+            level_obj = Level(
+                module=module,
+                name=level_name.capitalize(),
+                level=level_number,
+                category=category,
+            )
+            level_obj.save()
+        return level_obj
+
+    def add_attempt_counts(new_attempts):
+        """
+        Atomically adds to the attempt_count of level activities, given as
+        {level activity id: number of new attempts}, with a single UPDATE ...
+        RETURNING. Returns the previous attempt_count of each level activity;
+        its new attempts are numbered from there.
+        """
+        table = connection.ops.quote_name(LevelActivity._meta.db_table)
+        values = ", ".join(["(%s, %s)"] * len(new_attempts))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE {table}
+                SET attempt_count = {table}.attempt_count + new_attempts.count
+                FROM (VALUES {values}) AS new_attempts (id, count)
+                WHERE {table}.id = new_attempts.id
+                RETURNING {table}.id, {table}.attempt_count - new_attempts.count
+                """,
+                [value for item in new_attempts.items() for value in item],
+            )
+            return dict(cursor.fetchall())
+
+    def update_module_completion(module_activity):
+        all_levels = Level.objects.filter(module=module_activity.module.module)
+        logger.info(
+            "Get all the training levels before the assessment levels if the "
+            "attempt is for assessment level"
+        )
+
+        assessment_levels = all_levels.filter(category__name__iexact="assessment")
+        if assessment_levels.count() > 0:
+            completed_assessment_levels = LevelActivity.objects.filter(
+                module_activity=module_activity,
+                complete=True,
+                level__category__name__iexact="assessment",
+            )
+
+            if assessment_levels.count() == completed_assessment_levels.count():
+                module_activity.complete = True
+                module_activity.complete_date = datetime.now()
+                module_activity.save()
+            else:
+                module_activity.complete = False
+                module_activity.complete_date = None
+                module_activity.save()
+
+        # else:
+        #     training_levels = all_levels.filter(
+        #         ~Q(category__name__iexact="assessment")
+        #     )
+        #     if training_levels.count() > 0:
+        #         completed_training_levels = LevelActivity.objects.filter(
+        #             ~Q(level__category__name__iexact="assessment"),
+        #             module_activity=module_activity,
+        #             complete=True,
+        #         )
+        #         if training_levels.count() == completed_training_levels.count():
+        #             module_activity.complete = True
+        #             module_activity.complete_date = datetime.now()
+        #             module_activity.save()
+        #         else:
+        #             module_activity.complete = False
+        #             module_activity.complete_date = None
+        #             module_activity.save()
+
+    def update_module_completions(module_activities):
+        """
+        update_module_completion for several module activities, counting the
+        assessment levels and completed assessment levels in grouped queries.
+        """
+        assessment_levels = dict(
+            Level.objects.filter(
+                module__in={
+                    module_activity.module.module_id
+                    for module_activity in module_activities
+                },
+                category__name__iexact="assessment",
+            )
+            .values("module_id")
+            .annotate(count=Count("id"))
+            .values_list("module_id", "count")
+            .order_by()
+        )
+        completed_assessment_levels = dict(
+            LevelActivity.objects.filter(
+                module_activity__in=module_activities,
+                complete=True,
+                level__category__name__iexact="assessment",
+            )
+            .values("module_activity_id")
+            .annotate(count=Count("id"))
+            .values_list("module_activity_id", "count")
+            .order_by()
+        )
+        updated = []
+        buckets = set()
+        for module_activity in module_activities:
+            assessment_count = assessment_levels.get(
+                module_activity.module.module_id, 0
+            )
+            if assessment_count > 0:
+                buckets |= ModuleActivityRollups.get_buckets(
+                    module_activity.module_id,
+                    module_activity.assigned_on,
+                    module_activity.complete_date,
+                )
+                if assessment_count == completed_assessment_levels.get(
+                    module_activity.id, 0
+                ):
+                    module_activity.complete = True
+                    module_activity.complete_date = datetime.now()
+                else:
+                    module_activity.complete = False
+                    module_activity.complete_date = None
+                buckets |= ModuleActivityRollups.get_buckets(
+                    module_activity.module_id,
+                    module_activity.assigned_on,
+                    module_activity.complete_date,
+                )
+                updated.append(module_activity)
+        # bulk_update skips the rollup signals, so the buckets are refreshed here
+        ModuleActivity.objects.bulk_update(updated, ["complete", "complete_date"])
+        ModuleActivityRollups.refresh(buckets)
+
+    def ingest(data):
+        user_id = data["userId"]
+        org_id = data["orgId"]
+        user = None
+        try:
+            user = User.objects.get(organization_id=org_id, user_id=user_id)
+        except ObjectDoesNotExist:
+            logger.error(
+                f"User with user id {user_id} or organization id {org_id} not found"
+            )
+
+        module_name = data["module"]["name"]
+        level_name = data["module"]["level"]
+        logger.info(
+            f"get the module activity object given the module name as {module_name}"
+        )
+        try:
+            main_module = Module.objects.get(name__iexact=module_name)
+            module = ModuleAttributes.objects.get(
+                module__name__iexact=module_name, organization_id=org_id
+            )
+        except ObjectDoesNotExist:
+            logger.error(f"module {module_name} does not exist")
+
+        module_activity = ModuleActivity.objects.get(
+            user=user, module=module, active=True
+        )
+
+        # just for now to add through api...remove later
+        logger.info(
+            f"get the level from level name {level_name} or create level activity "
+            "if does not exist"
+        )
+        category = AttemptIngestion.get_category(data["module"]["category"])
+        level_obj = AttemptIngestion.get_level(main_module, level_name, category)
+        logger.info(f"level {level_name} fetched")
+        level_activity, created = LevelActivity.objects.get_or_create(
+            level=level_obj, module_activity=module_activity
+        )
+        logger.info("level activity fetched")
+
+        logger.info("mark the level as completed")
+        score = data.get("score", None)
+        if score is not None and module_name.lower() in SCORED_MODULES:
+            score = AttemptIngestion.get_score(data)
+            data["score"] = round(score, 2)
+        complete = AttemptIngestion.get_level_complete(module, module_name, score)
+        if complete is not None:
+            level_activity.complete = complete
+            level_activity.save(update_fields=["complete"])
+        tz = pytz.timezone("Asia/Kolkata")
+
+        logger.info("Create attempt data record")
+        attempt_counts = AttemptIngestion.add_attempt_counts({level_activity.id: 1})
+        attempt_number = attempt_counts[level_activity.id] + 1
+        summary, telemetry = AttemptTelemetries.split(data)
+        attempt = Attempt.objects.create(
+            level_activity=level_activity,
+            attempt_number=attempt_number,
+            data=summary,
+            duration=data["duration"],
+            start_time=datetime.fromtimestamp(int(data["startTime"]), tz),
+            end_time=datetime.fromtimestamp(int(data["endTime"]), tz),
+            **AttemptIngestion.get_summary(data, module, complete),
+        )
+        if telemetry is not None:
+            AttemptTelemetry.objects.create(attempt=attempt, game_data=telemetry)
+        AttemptMistake.objects.bulk_create(
+            AttemptIngestion.get_mistakes(attempt, data, user.id)
+        )
+
+        AttemptIngestion.update_module_completion(module_activity)
+        user_activity = UserActivity.objects.create(
+            module=main_module,
+            user=user,
+            duration=data["duration"],
+            start_time=datetime.fromtimestamp(int(data["startTime"]), tz),
+            end_time=datetime.fromtimestamp(int(data["endTime"]), tz),
+            log_event="module_activity",
+        )
+        ApplicationUsageCube.record(user_activity, user.organization_id)
+
+        logger.info("Successfully created attempt data")
+        return attempt
+
+    def get_failure(index, error):
+        return {"index": index, "status": "failed", "error": error}
+
+    def parse_payloads(payloads, results):
+        """
+        Validates the fields of each payload needed to resolve it. Returns the
+        items of the valid payloads and sets the failure of the others in
+        results.
+        """
+        tz = pytz.timezone("Asia/Kolkata")
+        duration_field = Attempt._meta.get_field("duration")
+        items = []
+        for index, data in enumerate(payloads):
+            try:
+                for key in ["name", "level", "category"]:
+                    if not isinstance(data["module"][key], str):
+                        raise TypeError(f"module {key} must be a string")
+                items.append(
+                    {
+                        "index": index,
+                        "data": data,
+                        "org_id": str(int(data["orgId"])),
+                        "user_id": str(data["userId"]),
+                        "module_name": data["module"]["name"],
+                        "level_name": data["module"]["level"],
+                        "category_name": data["module"]["category"],
+                        "duration": duration_field.to_python(data["duration"]),
+                        "start_time": datetime.fromtimestamp(
+                            int(data["startTime"]), tz
+                        ),
+                        "end_time": datetime.fromtimestamp(int(data["endTime"]), tz),
+                    }
+                )
+            except KeyError as e:
+                results[index] = AttemptIngestion.get_failure(
+                    index, f"missing field {e}"
+                )
+            except (TypeError, ValueError, ValidationError) as e:
+                results[index] = AttemptIngestion.get_failure(
+                    index, f"invalid payload: {e}"
+                )
+        return items
+
+    def get_batch_objects(items):
+        """
+        Returns the users, modules, module attributes and active module
+        activities of the items, each loaded with one query.
+        """
+        users = {
+            (str(user.organization_id), user.user_id): user
+            for user in User.objects.filter(
+                organization_id__in={item["org_id"] for item in items},
+                user_id__in={item["user_id"] for item in items},
+            )
+        }
+        module_names = {item["module_name"].lower() for item in items}
+        main_modules = {
+            module.lower_name: module
+            for module in Module.objects.annotate(lower_name=Lower("name")).filter(
+                lower_name__in=module_names
+            )
+        }
+        modules = {
+            (str(module.organization_id), module.lower_name): module
+            for module in ModuleAttributes.objects.annotate(
+                lower_name=Lower("module__name")
+            ).filter(
+                organization_id__in={item["org_id"] for item in items},
+                lower_name__in=module_names,
+            )
+        }
+        module_activities = {
+            (module_activity.user_id, module_activity.module_id): module_activity
+            for module_activity in ModuleActivity.objects.filter(
+                user__in=users.values(), module__in=modules.values(), active=True
+            ).select_related("module__module")
+        }
+        return users, main_modules, modules, module_activities
+
+    def resolve_item(item, batch_objects):
+        """
+        Sets the user, module and module activity of an item and scores it.
+        Returns the error when the item cannot be recorded, otherwise None.
+        """
+        users, main_modules, modules, module_activities = batch_objects
+        user = users.get((item["org_id"], item["user_id"]))
+        main_module = main_modules.get(item["module_name"].lower())
+        module = modules.get((item["org_id"], item["module_name"].lower()))
+        if user is None:
+            return (
+                f"User with user id {item['user_id']} or organization id "
+                f"{item['org_id']} not found"
+            )
+        if main_module is None or module is None:
+            return f"module {item['module_name']} does not exist"
+        if (user.id, module.id) not in module_activities:
+            return f"module {item['module_name']} is not assigned to the user"
+
+        # scored before the batch transaction, so malformed game data fails
+        # its own item rather than the batch
+        data = item["data"]
+        try:
+            score = data.get("score", None)
+            if score is not None and item["module_name"].lower() in SCORED_MODULES:
+                score = AttemptIngestion.get_score(data)
+                data["score"] = round(score, 2)
+            item["complete"] = AttemptIngestion.get_level_complete(
+                module, item["module_name"], score
+            )
+        except Exception as e:
+            return f"invalid game data: {type(e).__name__}: {e}"
+        item["user"] = user
+        item["main_module"] = main_module
+        item["module"] = module
+        item["module_activity"] = module_activities[(user.id, module.id)]
+        return None
+
+    def resolve_levels(resolved):
+        """
+        Sets the level of each item. Missing levels are created and existing
+        ones moved to the category of their last item, as ingesting the items
+        one at a time would. Only the levels whose category changes are
+        written, locked in id order, so concurrent batches touching the same
+        levels cannot deadlock on them.
+        """
+        categories = {}
+        level_categories = {}
+        for item in resolved:
+            category_key = item["category_name"].lower()
+            if category_key not in categories:
+                categories[category_key] = AttemptIngestion.get_category(
+                    item["category_name"]
+                )
+            level_key = (item["main_module"].id, item["level_name"].lower())
+            level_categories[level_key] = (item, categories[category_key])
+
+        levels = {}
+        for level in (
+            Level.objects.annotate(lower_name=Lower("name"))
+            .filter(
+                module_id__in={key[0] for key in level_categories},
+                lower_name__in={key[1] for key in level_categories},
+            )
+            .order_by("id")
+        ):
+            levels.setdefault((level.module_id, level.lower_name), level)
+
+        changed = {
+            levels[key].id: category
+            for key, (_, category) in level_categories.items()
+            if key in levels and levels[key].category_id != category.id
+        }
+        # FOR NO KEY UPDATE, as the category is not a key, so that foreign key
+        # checks of batches holding level activity locks are not blocked
+        locked = list(
+            Level.objects.select_for_update(no_key=True)
+            .filter(id__in=changed)
+            .order_by("id")
+        )
+        for level in locked:
+            level.category = changed[level.id]
+        Level.objects.bulk_update(locked, ["category"])
+        for level in levels.values():
+            if level.id in changed:
+                level.category = changed[level.id]
+
+        missing = [key for key in level_categories if key not in levels]
+        last_levels = dict(
+            Level.objects.filter(module_id__in={key[0] for key in missing})
+            .values("module_id")
+            .annotate(last_level=Max("level"))
+            .values_list("module_id", "last_level")
+            .order_by()
+        )
+        new_levels = []
+        for key in missing:
+            item, category = level_categories[key]
+            last_levels[key[0]] = last_levels.get(key[0], 0) + 1
+            levels[key] = Level(
+                module=item["main_module"],
+                name=item["level_name"].capitalize(),
+                level=last_levels[key[0]],
+                category=category,
+            )
+            new_levels.append(levels[key])
+        Level.objects.bulk_create(new_levels)
+
+        for item in resolved:
+            item["level"] = levels[(item["main_module"].id, item["level_name"].lower())]
+
+    def get_level_activities(resolved):
+        """
+        Returns the level activities of the items by (module activity id, level
+        id), creating the missing ones, locked in id order so that concurrent
+        batches incrementing their attempt counts cannot deadlock.
+        """
+        keys = {(item["module_activity"].id, item["level"].id) for item in resolved}
+        level_activities = LevelActivity.objects.filter(
+            module_activity_id__in={key[0] for key in keys},
+            level_id__in={key[1] for key in keys},
+        )
+        existing = set(level_activities.values_list("module_activity_id", "level_id"))
+        LevelActivity.objects.bulk_create(
+            [
+                LevelActivity(module_activity_id=key[0], level_id=key[1])
+                for key in sorted(keys - existing)
+            ]
+        )
+        locked = {}
+        level_activities = level_activities.select_for_update(no_key=True)
+        for level_activity in level_activities.order_by("id"):
+            key = (level_activity.module_activity_id, level_activity.level_id)
+            if key in keys:
+                locked.setdefault(key, level_activity)
+        return locked
+
+    def build_rows(resolved, level_activities, attempt_numbers):
+        """
+        Returns the attempts, telemetries and user activities of the items,
+        numbering the attempts of each level activity from attempt_numbers,
+        and the level activities whose completion the items set.
+        """
+        attempts = []
+        telemetries = []
+        user_activities = []
+        changed_level_activities = {}
+        for item in resolved:
+            data = item["data"]
+            level_activity = level_activities[
+                (item["module_activity"].id, item["level"].id)
+            ]
+
+            complete = item["complete"]
+            if complete is not None:
+                level_activity.complete = complete
+                changed_level_activities[level_activity.id] = level_activity
+
+            attempt_number = attempt_numbers[level_activity.id] + 1
+            attempt_numbers[level_activity.id] = attempt_number
+            summary, telemetry = AttemptTelemetries.split(data)
+            attempts.append(
+                Attempt(
+                    level_activity=level_activity,
+                    attempt_number=attempt_number,
+                    data=summary,
+                    duration=item["duration"],
+                    start_time=item["start_time"],
+                    end_time=item["end_time"],
+                    **AttemptIngestion.get_summary(data, item["module"], complete),
+                )
+            )
+            telemetries.append(telemetry)
+            user_activities.append(
+                UserActivity(
+                    module=item["main_module"],
+                    user=item["user"],
+                    duration=item["duration"],
+                    start_time=item["start_time"],
+                    end_time=item["end_time"],
+                    log_event="module_activity",
+                )
+            )
+        return attempts, telemetries, user_activities, changed_level_activities
+
+    def ingest_many(payloads):
+        """
+        Records a batch of attempt payloads, e.g. sessions synced by a headset
+        that was offline. Users, modules, levels and level activities are
+        resolved once per batch and attempts and user activities are inserted
+        with bulk_create. Returns one result per payload, in order; payloads
+        that cannot be resolved fail on their own without failing the batch.
+        """
+        results = [None] * len(payloads)
+        items = AttemptIngestion.parse_payloads(payloads, results)
+        batch_objects = AttemptIngestion.get_batch_objects(items)
+        resolved = []
+        for item in items:
+            error = AttemptIngestion.resolve_item(item, batch_objects)
+            if error is None:
+                resolved.append(item)
+            else:
+                results[item["index"]] = AttemptIngestion.get_failure(
+                    item["index"], error
+                )
+        if not resolved:
+            return results
+
+        with transaction.atomic():
+            AttemptIngestion.resolve_levels(resolved)
+            level_activities = AttemptIngestion.get_level_activities(resolved)
+            attempt_numbers = AttemptIngestion.add_attempt_counts(
+                Counter(
+                    level_activities[(item["module_activity"].id, item["level"].id)].id
+                    for item in resolved
+                )
+            )
+            (
+                attempts,
+                telemetries,
+                user_activities,
+                changed_level_activities,
+            ) = AttemptIngestion.build_rows(resolved, level_activities, attempt_numbers)
+
+            LevelActivity.objects.bulk_update(
+                changed_level_activities.values(), ["complete"]
+            )
+            Attempt.objects.bulk_create(attempts)
+            AttemptTelemetry.objects.bulk_create(
+                [
+                    AttemptTelemetry(attempt=attempt, game_data=telemetry)
+                    for attempt, telemetry in zip(attempts, telemetries)
+                    if telemetry is not None
+                ]
+            )
+            AttemptMistake.objects.bulk_create(
+                [
+                    mistake
+                    for item, attempt in zip(resolved, attempts)
+                    for mistake in AttemptIngestion.get_mistakes(
+                        attempt, item["data"], item["user"].id
+                    )
+                ]
+            )
+            module_activities = {
+                item["module_activity"].id: item["module_activity"] for item in resolved
+            }
+            AttemptIngestion.update_module_completions(list(module_activities.values()))
+            UserActivity.objects.bulk_create(user_activities)
+            ApplicationUsageCube.record_many(user_activities)
+            # bulk_create skips the analytics cache signals
+            AnalyticsCache.invalidate(
+                {item["user"].organization_id for item in resolved}
+            )
+
+        for item, attempt in zip(resolved, attempts):
+            results[item["index"]] = {
+                "index": item["index"],
+                "status": "created",
+                "attempt_id": attempt.id,
+                "attempt_number": attempt.attempt_number,
+            }
+        logger.info(f"Successfully created {len(attempts)} attempts from a batch")
+        return results
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from organizations.rollups import ApplicationUsageCube
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the daily application usage cube from UserActivity history"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--organization",
+            type=int,
+            default=None,
+            help="Only backfill the usage of the given organization id",
+        )
+
+    def handle(self, *args, **options):
+        rows = ApplicationUsageCube.rebuild(options["organization"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Backfilled {} daily application usage rows".format(rows)
+            )
+        )
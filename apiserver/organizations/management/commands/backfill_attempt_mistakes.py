@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from organizations.ingestion import AttemptIngestion
+from organizations.models import Attempt, AttemptMistake
+from organizations.utils import get_attempt_data
+
+
+class Command(BaseCommand):
+    help = "Creates the AttemptMistake rows of existing attempts from their data"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of attempts read per transaction",
+        )
+
+    def handle(self, *args, **options):
+        attempts = (
+            Attempt.objects.select_related("level_activity__module_activity__module")
+            .filter(~Exists(AttemptMistake.objects.filter(attempt=OuterRef("pk"))))
+            .order_by("id")
+        )
+
+        last_id = 0
+        read = 0
+        created = 0
+        while True:
+            batch = list(attempts.filter(id__gt=last_id)[: options["batch_size"]])
+            if not batch:
+                break
+            mistakes = []
+            for attempt in batch:
+                module_activity = attempt.level_activity.module_activity
+                # the summary columns may not be backfilled yet
+                attempt.module_id = module_activity.module_id
+                attempt.organization_id = module_activity.module.organization_id
+                mistakes += AttemptIngestion.get_mistakes(
+                    attempt, get_attempt_data(attempt.data), module_activity.user_id
+                )
+            with transaction.atomic():
+                AttemptMistake.objects.bulk_create(mistakes)
+            read += len(batch)
+            created += len(mistakes)
+            last_id = batch[-1].id
+            self.stdout.write(
+                "Read {} attempts, created {} mistakes".format(read, created)
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Created {} mistakes for {} attempts".format(created, read)
+            )
+        )
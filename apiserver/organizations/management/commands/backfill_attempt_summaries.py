@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from organizations.cache import AnalyticsCache
+from organizations.ingestion import AttemptIngestion
+from organizations.models import Attempt
+from organizations.utils import get_attempt_data
+
+SUMMARY_FIELDS = ["module", "organization", "score", "mistake_count", "passed"]
+
+
+class Command(BaseCommand):
+    help = "Fills the Attempt summary columns from the data of existing attempts"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of attempts updated per transaction",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Recompute attempts that already have a summary",
+        )
+
+    def handle(self, *args, **options):
+        attempts = Attempt.objects.select_related(
+            "level_activity__module_activity__module__module"
+        ).order_by("id")
+        if not options["all"]:
+            attempts = attempts.filter(module__isnull=True)
+
+        last_id = 0
+        updated = 0
+        while True:
+            batch = list(attempts.filter(id__gt=last_id)[: options["batch_size"]])
+            if not batch:
+                break
+            for attempt in batch:
+                data = get_attempt_data(attempt.data)
+                module = attempt.level_activity.module_activity.module
+                summary = AttemptIngestion.get_summary(data, module, None)
+                if summary["passed"] is None:
+                    summary["passed"] = AttemptIngestion.get_level_complete(
+                        module, module.module.name, summary["score"]
+                    )
+                for field, value in summary.items():
+                    setattr(attempt, field, value)
+            with transaction.atomic():
+                Attempt.objects.bulk_update(batch, SUMMARY_FIELDS)
+                AnalyticsCache.invalidate(
+                    {attempt.organization_id for attempt in batch}
+                )
+            updated += len(batch)
+            last_id = batch[-1].id
+            self.stdout.write("Updated {} attempts".format(updated))
+        self.stdout.write(
+            self.style.SUCCESS("Filled the summary of {} attempts".format(updated))
+        )
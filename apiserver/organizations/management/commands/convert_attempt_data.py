@@ -0,0 +1,69 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from organizations.models import Attempt
+
+
+class Command(BaseCommand):
+    help = (
+        "Converts Attempt.data stored as a JSON encoded string into a JSON "
+        "object, in batches so it can run while the server is up"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of attempts converted per transaction",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0,
+            help="Seconds to wait between batches",
+        )
+
+    def handle(self, *args, **options):
+        table = connection.ops.quote_name(Attempt._meta.db_table)
+        # SKIP LOCKED leaves rows being written by a request to a later batch
+        # instead of waiting on them
+        sql = f"""
+            UPDATE {table} SET data = (data #>> '{{}}')::jsonb
+            WHERE id IN (
+                SELECT id FROM {table}
+                WHERE jsonb_typeof(data) = 'string'
+                ORDER BY id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+        """
+        converted = 0
+        while True:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(sql, [options["batch_size"]])
+                batch = cursor.rowcount
+            # a short batch can still leave rows that were locked, so only
+            # an empty one means there is nothing left to convert
+            if not batch:
+                break
+            converted += batch
+            self.stdout.write("Converted {} attempts".format(converted))
+            time.sleep(options["sleep"])
+        self.stdout.write(
+            self.style.SUCCESS("Converted {} attempts in total".format(converted))
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT count(*) FROM {table} WHERE jsonb_typeof(data) = 'string'"
+            )
+            remaining = cursor.fetchone()[0]
+        if remaining:
+            self.stdout.write(
+                self.style.WARNING(
+                    "{} attempts stayed locked by other transactions, run the "
+                    "command again to convert them".format(remaining)
+                )
+            )
@@ -0,0 +1,102 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from organizations.models import Attempt, ModuleActivity, Organization, UserActivity
+
+
+def get_hot_queries(organization_id, days=90):
+    """
+    The filter paths most analytics share, with the indexes added for them,
+    as (description, index names, queryset).
+    """
+    end = timezone.now()
+    start = end - timedelta(days=days)
+    assigned_modules = ModuleActivity.objects.filter(
+        user__organization_id=organization_id,
+        user__deleted=False,
+        active=True,
+    )
+    return [
+        (
+            "active module activities of the active users of an organization",
+            ["user_org_active_idx"],
+            ModuleActivity.objects.filter(
+                user__organization_id=organization_id,
+                user__active=True,
+                user__deleted=False,
+                active=True,
+            )
+            .values("module_id")
+            .annotate(count=Count("id"))
+            .order_by(),
+        ),
+        (
+            "attempts of the assigned modules of an organization ended "
+            "between two dates",
+            ["attempt_level_end_date_idx"],
+            Attempt.objects.filter(
+                level_activity__module_activity__in=assigned_modules,
+                end_time__date__gte=start.date(),
+                end_time__date__lte=end.date(),
+            ).only("level_activity_id", "attempt_number", "duration", "end_time"),
+        ),
+        (
+            "user activities of an organization ended since a date",
+            ["useractivity_user_end_idx"],
+            UserActivity.objects.filter(
+                user__organization_id=organization_id, end_time__gte=start
+            )
+            .values("module_id")
+            .annotate(total_duration=Sum("duration"))
+            .order_by(),
+        ),
+    ]
+
+
+def explain(queryset, analyze=False, seqscan=True):
+    sql, params = queryset.query.sql_with_params()
+    options = "ANALYZE, BUFFERS" if analyze else "COSTS"
+    with transaction.atomic(), connection.cursor() as cursor:
+        if not seqscan:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute(f"EXPLAIN ({options}) {sql}", params)
+        return "\n".join(row[0] for row in cursor.fetchall())
+
+
+class Command(BaseCommand):
+    help = (
+        "Prints the query plans of the hot analytics queries of an organization "
+        "and whether they use the indexes added for them"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("organization_id", type=int)
+        parser.add_argument("--days", type=int, default=90)
+        parser.add_argument(
+            "--analyze", action="store_true", help="Run the queries (EXPLAIN ANALYZE)"
+        )
+
+    def handle(self, *args, **options):
+        if not Organization.objects.filter(id=options["organization_id"]).exists():
+            raise CommandError("Organization not found")
+
+        for description, indexes, queryset in get_hot_queries(
+            options["organization_id"], options["days"]
+        ):
+            plan = explain(queryset, analyze=options["analyze"])
+            missing = [index for index in indexes if index not in plan]
+            self.stdout.write(self.style.MIGRATE_HEADING(description))
+            self.stdout.write(plan)
+            if missing:
+                self.stdout.write(
+                    self.style.WARNING("Not using {}".format(", ".join(missing)))
+                )
+            else:
+                self.stdout.write(
+                    self.style.SUCCESS("Using {}".format(", ".join(indexes)))
+                )
+            self.stdout.write("")
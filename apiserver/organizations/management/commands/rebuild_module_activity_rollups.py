@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from organizations.rollups import ModuleActivityRollups
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the monthly ModuleActivity rollups from scratch"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--organization",
+            type=int,
+            default=None,
+            help="Only rebuild the rollups of the given organization id",
+        )
+
+    def handle(self, *args, **options):
+        buckets = ModuleActivityRollups.rebuild(options["organization"])
+        self.stdout.write(
+            self.style.SUCCESS("Rebuilt {} module activity rollups".format(buckets))
+        )
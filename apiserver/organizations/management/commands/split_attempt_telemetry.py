@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from organizations.models import Attempt
+from organizations.telemetry import AttemptTelemetries
+from organizations.utils import get_attempt_data
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves the time series of existing attempts into AttemptTelemetry. "
+        "Run convert_attempt_data first so string encoded attempts are found"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Number of attempts split per transaction",
+        )
+
+    def handle(self, *args, **options):
+        attempts = Attempt.objects.filter(
+            Q(data__gameData__has_key="path") | Q(data__gameData__has_key="graph"),
+            telemetry__isnull=True,
+        ).order_by("id")
+        last_id = 0
+        split = 0
+        while True:
+            batch = list(attempts.filter(id__gt=last_id)[: options["batch_size"]])
+            if not batch:
+                break
+            with transaction.atomic():
+                for attempt in batch:
+                    if AttemptTelemetries.split_attempt(
+                        attempt, get_attempt_data(attempt.data)
+                    ):
+                        split += 1
+            last_id = batch[-1].id
+            self.stdout.write("Split {} attempts".format(split))
+        self.stdout.write(
+            self.style.SUCCESS("Split the telemetry of {} attempts".format(split))
+        )
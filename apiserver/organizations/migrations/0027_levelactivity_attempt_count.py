@@ -0,0 +1,35 @@
+# Generated by Django 4.1.3 on 2026-10-18 17:51
+
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_attempt_count(apps, schema_editor):
+    LevelActivity = apps.get_model("organizations", "LevelActivity")
+    Attempt = apps.get_model("organizations", "Attempt")
+    last_attempt_number = (
+        Attempt.objects.filter(level_activity=OuterRef("pk"))
+        .values("level_activity")
+        .annotate(last_attempt_number=Max("attempt_number"))
+        .values("last_attempt_number")
+    )
+    LevelActivity.objects.update(
+        attempt_count=Coalesce(Subquery(last_attempt_number), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("organizations", "0026_attemptingest"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="levelactivity",
+            name="attempt_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_attempt_count, migrations.RunPython.noop),
+    ]
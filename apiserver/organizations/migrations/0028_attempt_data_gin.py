@@ -0,0 +1,23 @@
+# Generated by Django 4.1.3 on 2026-10-18 17:52
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # the index is built concurrently so attempts can still be written
+    atomic = False
+
+    dependencies = [
+        ("organizations", "0027_levelactivity_attempt_count"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="attempt",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["data"], name="attempt_data_gin"
+            ),
+        ),
+    ]
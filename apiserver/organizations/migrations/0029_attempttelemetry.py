@@ -0,0 +1,33 @@
+# Generated by Django 4.1.3 on 2026-10-18 17:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("organizations", "0028_attempt_data_gin"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AttemptTelemetry",
+            fields=[
+                (
+                    "attempt",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="telemetry",
+                        serialize=False,
+                        to="organizations.attempt",
+                    ),
+                ),
+                ("game_data", models.JSONField(default=dict)),
+            ],
+            options={
+                "verbose_name_plural": "Attempt Telemetry",
+            },
+        ),
+    ]
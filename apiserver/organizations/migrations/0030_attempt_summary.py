@@ -0,0 +1,60 @@
+# Generated by Django 4.1.3 on 2026-10-18 17:55
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    # the index is built concurrently so attempts can still be written
+    atomic = False
+
+    dependencies = [
+        ("organizations", "0029_attempttelemetry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="attempt",
+            name="mistake_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="attempt",
+            name="module",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="organizations.moduleattributes",
+            ),
+        ),
+        migrations.AddField(
+            model_name="attempt",
+            name="organization",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="organizations.organization",
+            ),
+        ),
+        migrations.AddField(
+            model_name="attempt",
+            name="passed",
+            field=models.BooleanField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="attempt",
+            name="score",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        AddIndexConcurrently(
+            model_name="attempt",
+            index=models.Index(
+                fields=["organization", "module", "end_time"],
+                include=("score", "mistake_count", "passed"),
+                name="attempt_summary_idx",
+            ),
+        ),
+    ]
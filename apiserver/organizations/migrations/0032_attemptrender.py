@@ -0,0 +1,32 @@
+# Generated by Django 4.1.3 on 2026-10-18 18:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("organizations", "0031_attemptmistake"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AttemptRender",
+            fields=[
+                (
+                    "attempt",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="render",
+                        serialize=False,
+                        to="organizations.attempt",
+                    ),
+                ),
+                ("version", models.PositiveIntegerField()),
+                ("content", models.BinaryField()),
+                ("rendered_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.1.3 on 2026-10-18 19:09
+
+import django.db.models.functions.datetime
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # the indexes are built concurrently so attempts and user activities can
+    # still be written
+    atomic = False
+
+    dependencies = [
+        ("organizations", "0032_attemptrender"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="attempt",
+            index=models.Index(
+                models.F("level_activity"),
+                django.db.models.functions.datetime.TruncDate("end_time"),
+                name="attempt_level_end_date_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="useractivity",
+            index=models.Index(
+                fields=["user", "end_time"], name="useractivity_user_end_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.1.3 on 2026-10-18 19:36
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_usages(apps, schema_editor):
+    DailyApplicationUsage = apps.get_model("organizations", "DailyApplicationUsage")
+    usages = DailyApplicationUsage.objects.filter(organization=None)
+    duplicates = (
+        usages.values("module_id", "user_id", "day")
+        .annotate(
+            count=Count("id"),
+            keep_id=Min("id"),
+            total_duration=Sum("total_duration"),
+            sessions=Sum("sessions"),
+        )
+        .filter(count__gt=1)
+        .order_by()
+    )
+    for duplicate in duplicates.iterator():
+        usages.filter(id=duplicate["keep_id"]).update(
+            total_duration=duplicate["total_duration"],
+            sessions=duplicate["sessions"],
+        )
+        usages.filter(
+            module_id=duplicate["module_id"],
+            user_id=duplicate["user_id"],
+            day=duplicate["day"],
+        ).exclude(id=duplicate["keep_id"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("organizations", "0033_analytics_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_usages, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="dailyapplicationusage",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("organization__isnull", True)),
+                fields=("module", "user", "day"),
+                name="dailyapplicationusage_no_organization_unique",
+            ),
+        ),
+    ]
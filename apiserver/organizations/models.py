@@ -1,7 +1,10 @@
 from django.db import models
+from django.db.models.functions import TruncDate
 from django.contrib.postgres.fields import JSONField
+from django.contrib.postgres.indexes import GinIndex
 from datetime import timedelta
 import os
+import uuid
 
 
 def logo_path(instance, filename):
@@ -97,6 +100,8 @@ class LevelActivity(models.Model):
     module_activity = models.ForeignKey(ModuleActivity, on_delete=models.CASCADE)
     level = models.ForeignKey(Level, on_delete=models.CASCADE)
     complete = models.BooleanField(default=True)
+    # number of attempts recorded, incremented atomically on ingest
+    attempt_count = models.PositiveIntegerField(default=0)
 
     class Meta:
         verbose_name_plural = "Level Activities"
@@ -113,12 +118,101 @@ class Attempt(models.Model):
     start_time = models.DateTimeField()
     end_time = models.DateTimeField()
     created_at = models.DateTimeField(auto_now_add=True)
+    # summary of data, filled in at ingest so reports can aggregate in SQL
+    module = models.ForeignKey(
+        ModuleAttributes, on_delete=models.CASCADE, null=True, blank=True
+    )
+    organization = models.ForeignKey(
+        Organization, on_delete=models.CASCADE, null=True, blank=True
+    )
+    score = models.FloatField(null=True, blank=True)
+    mistake_count = models.PositiveIntegerField(default=0)
+    passed = models.BooleanField(null=True, blank=True)
 
     class Meta:
         unique_together = (
             "level_activity",
             "attempt_number",
         )
+        indexes = [
+            GinIndex(fields=["data"], name="attempt_data_gin"),
+            models.Index(
+                fields=["organization", "module", "end_time"],
+                include=["score", "mistake_count", "passed"],
+                name="attempt_summary_idx",
+            ),
+            # reports filter on end_time__date, the end date in TIME_ZONE
+            models.Index(
+                models.F("level_activity"),
+                TruncDate("end_time"),
+                name="attempt_level_end_date_idx",
+            ),
+        ]
+
+
+class AttemptTelemetry(models.Model):
+    """
+    Time series split out of Attempt.data (gameData.path and the series
+    plotted by gameData.graph), loaded only when an attempt is rendered.
+    """
+
+    attempt = models.OneToOneField(
+        Attempt, on_delete=models.CASCADE, primary_key=True, related_name="telemetry"
+    )
+    game_data = models.JSONField(default=dict)
+
+    class Meta:
+        verbose_name_plural = "Attempt Telemetry"
+
+
+class AttemptRender(models.Model):
+    """
+    zlib compressed JSON of AttemptSerializer.get_data for an attempt, built
+    by organizations/renders.py. Renders of an older renderer version are
+    rebuilt when read.
+    """
+
+    attempt = models.OneToOneField(
+        Attempt, on_delete=models.CASCADE, primary_key=True, related_name="render"
+    )
+    version = models.PositiveIntegerField()
+    content = models.BinaryField()
+    rendered_at = models.DateTimeField(auto_now=True)
+
+
+class AttemptMistake(models.Model):
+    """
+    One entry of gameData.mistakes of an attempt, exploded at ingest so
+    mistake breakdowns and trends can be grouped in SQL.
+    """
+
+    attempt = models.ForeignKey(
+        Attempt, on_delete=models.CASCADE, related_name="mistakes"
+    )
+    module = models.ForeignKey(ModuleAttributes, on_delete=models.CASCADE)
+    user = models.ForeignKey(to="accounts.User", on_delete=models.CASCADE)
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE)
+    name = models.CharField(max_length=255)
+    count = models.PositiveIntegerField(default=1)
+    # index in gameData.mistakes, keeps the order the headset reported
+    position = models.PositiveSmallIntegerField(default=0)
+    # end_time of the attempt
+    timestamp = models.DateTimeField()
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["organization", "module", "timestamp"],
+                name="mistake_org_module_idx",
+            ),
+            models.Index(
+                fields=["user", "module", "timestamp"],
+                name="mistake_user_module_idx",
+            ),
+        ]
 
 
 # class Assessment(models.Model):
@@ -154,3 +248,96 @@ class UserActivity(models.Model):
 
     class Meta:
         verbose_name_plural = "User Activities"
+        indexes = [
+            models.Index(fields=["user", "end_time"], name="useractivity_user_end_idx"),
+        ]
+
+
+class ModuleActivityRollup(models.Model):
+    """
+    Monthly assignment/completion counts per organization module, counting only
+    module activities of active, non deleted users. Kept current by the
+    ModuleActivity and User signals in organizations/signals.py.
+    """
+
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE)
+    module = models.ForeignKey(ModuleAttributes, on_delete=models.CASCADE)
+    month = models.DateField()
+    assigned = models.PositiveIntegerField(default=0)
+    active = models.PositiveIntegerField(default=0)
+    completed = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Module Activity Rollups"
+        unique_together = (
+            "organization",
+            "module",
+            "month",
+        )
+
+
+class DailyApplicationUsage(models.Model):
+    """
+    Daily UserActivity totals per user and module, used by the application
+    usage analytics instead of scanning UserActivity.
+    """
+
+    organization = models.ForeignKey(
+        Organization, on_delete=models.CASCADE, null=True, blank=True
+    )
+    module = models.ForeignKey(Module, on_delete=models.CASCADE)
+    user = models.ForeignKey(to="accounts.User", on_delete=models.CASCADE)
+    day = models.DateField()
+    total_duration = models.DurationField(default=timedelta)
+    sessions = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Daily Application Usage"
+        unique_together = (
+            "organization",
+            "module",
+            "user",
+            "day",
+        )
+        # NULLs are distinct in unique_together, so users without an
+        # organization need their own constraint
+        constraints = [
+            models.UniqueConstraint(
+                fields=["module", "user", "day"],
+                condition=models.Q(organization__isnull=True),
+                name="dailyapplicationusage_no_organization_unique",
+            ),
+        ]
+
+
+class AttemptIngest(models.Model):
+    """
+    Raw attempt payload accepted from a headset, processed in the background
+    by the process_attempt_ingest task.
+    """
+
+    PENDING = "pending"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (PENDING, "Pending"),
+        (COMPLETED, "Completed"),
+        (FAILED, "Failed"),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    idempotency_key = models.CharField(max_length=255, unique=True)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default=PENDING, db_index=True
+    )
+    attempt = models.OneToOneField(
+        Attempt, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    error = models.TextField(blank=True)
+    retries = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.idempotency_key} ({self.status})"
@@ -0,0 +1,71 @@
+import json
+import zlib
+
+from rest_framework.renderers import JSONRenderer
+
+from organizations.models import Attempt, AttemptRender
+from organizations.serializers import AttemptSerializer
+
+# bump whenever AttemptSerializer.get_data changes its output, stored renders
+# of older versions are then rebuilt the next time they are read
+RENDERER_VERSION = 1
+
+
+class AttemptRenders:
+    """
+    Stores the output of AttemptSerializer.get_data per attempt so
+    attempt-data/ does not score, split paths and extract graphs again on
+    every request. The attempt data never changes once stored; renders are
+    dropped when the passing score of their module changes.
+    """
+
+    def render(attempt):
+        data = AttemptSerializer().render_data(attempt)
+        return zlib.compress(JSONRenderer().render(data))
+
+    def store(attempts):
+        """
+        Renders the attempts and saves them, replacing older renders. Returns
+        the rendered data by attempt id.
+        """
+        renders = [
+            AttemptRender(
+                attempt_id=attempt.id,
+                version=RENDERER_VERSION,
+                content=AttemptRenders.render(attempt),
+            )
+            for attempt in attempts
+        ]
+        AttemptRender.objects.bulk_create(
+            renders,
+            update_conflicts=True,
+            unique_fields=["attempt_id"],
+            update_fields=["version", "content", "rendered_at"],
+        )
+        return {
+            render.attempt_id: json.loads(zlib.decompress(render.content))
+            for render in renders
+        }
+
+    def get_many(attempts):
+        """
+        Returns the rendered data by attempt id, rendering the attempts that
+        have no render of the current version.
+        """
+        data = {
+            attempt_id: json.loads(zlib.decompress(content))
+            for attempt_id, content in AttemptRender.objects.filter(
+                attempt__in=[attempt.id for attempt in attempts],
+                version=RENDERER_VERSION,
+            ).values_list("attempt_id", "content")
+        }
+        missing = [attempt for attempt in attempts if attempt.id not in data]
+        if missing:
+            data.update(AttemptRenders.store(missing))
+        return data
+
+    def refresh(attempt_ids):
+        attempts = Attempt.objects.filter(id__in=attempt_ids).select_related(
+            "level_activity__module_activity__module", "telemetry"
+        )
+        return len(AttemptRenders.store(list(attempts)))
@@ -0,0 +1,294 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from dateutil.relativedelta import relativedelta
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, DateField, F, Q, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+
+from organizations.models import (
+    DailyApplicationUsage,
+    ModuleActivity,
+    ModuleActivityRollup,
+    ModuleAttributes,
+    UserActivity,
+)
+
+
+def get_local_date(value):
+    # naive datetimes (e.g. complete_date set from datetime.now()) are stored
+    # in the default time zone, so they are read the same way here
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return timezone.localtime(value).date()
+
+
+class ModuleActivityRollups:
+    """
+    Maintains ModuleActivityRollup rows.
+
+    `assigned` counts every assignment made in the month, `active` the ones
+    still active and `completed` the active ones completed in the month. Only
+    users that are active and not deleted are counted, matching the filters
+    used by the dashboard analytics.
+    """
+
+    def get_month(value):
+        if value is None:
+            return None
+        return get_local_date(value).replace(day=1)
+
+    def get_buckets(module_id, assigned_on, complete_date):
+        buckets = {(module_id, ModuleActivityRollups.get_month(assigned_on))}
+        if complete_date is not None:
+            buckets.add((module_id, ModuleActivityRollups.get_month(complete_date)))
+        return buckets
+
+    def get_live_activities():
+        return ModuleActivity.objects.filter(
+            user__organization=F("module__organization"),
+            user__deleted=False,
+            user__active=True,
+        )
+
+    def count_by_month(module_activities):
+        counts = defaultdict(lambda: {"assigned": 0, "active": 0, "completed": 0})
+        assigned = (
+            module_activities.annotate(
+                month=TruncMonth("assigned_on", output_field=DateField())
+            )
+            .values("module_id", "month")
+            .annotate(
+                assigned=Count("id"),
+                active=Count("id", filter=Q(active=True)),
+            )
+            .order_by()
+        )
+        for row in assigned:
+            bucket = counts[(row["module_id"], row["month"])]
+            bucket["assigned"] = row["assigned"]
+            bucket["active"] = row["active"]
+
+        completed = (
+            module_activities.filter(active=True, complete=True)
+            .exclude(complete_date=None)
+            .annotate(month=TruncMonth("complete_date", output_field=DateField()))
+            .values("module_id", "month")
+            .annotate(completed=Count("id"))
+            .order_by()
+        )
+        for row in completed:
+            counts[(row["module_id"], row["month"])]["completed"] = row["completed"]
+        return counts
+
+    def save_counts(counts):
+        organizations = dict(
+            ModuleAttributes.objects.filter(
+                id__in={module_id for module_id, _ in counts}
+            ).values_list("id", "organization_id")
+        )
+        rollups = [
+            ModuleActivityRollup(
+                organization_id=organizations[module_id],
+                module_id=module_id,
+                month=month,
+                **values,
+            )
+            for (module_id, month), values in counts.items()
+            if module_id in organizations
+        ]
+        ModuleActivityRollup.objects.bulk_create(
+            rollups,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["organization_id", "module_id", "month"],
+            update_fields=["assigned", "active", "completed"],
+        )
+
+    def refresh(buckets):
+        """
+        Recomputes the given (module attribute id, month) buckets from
+        ModuleActivity. Buckets that no longer have any activity are deleted.
+        """
+        months_by_module = defaultdict(set)
+        for module_id, month in buckets:
+            if module_id is not None and month is not None:
+                months_by_module[module_id].add(month)
+        if not months_by_module:
+            return
+
+        bucket_query = Q()
+        for module_id, months in months_by_module.items():
+            start = min(months)
+            end = max(months) + relativedelta(months=1)
+            bucket_query |= Q(
+                Q(assigned_on__date__gte=start, assigned_on__date__lt=end)
+                | Q(complete_date__date__gte=start, complete_date__date__lt=end),
+                module_id=module_id,
+            )
+        counts = ModuleActivityRollups.count_by_month(
+            ModuleActivityRollups.get_live_activities().filter(bucket_query)
+        )
+
+        refreshed = {}
+        emptied = Q()
+        for module_id, months in months_by_module.items():
+            empty_months = set()
+            for month in months:
+                if (module_id, month) in counts:
+                    refreshed[(module_id, month)] = counts[(module_id, month)]
+                else:
+                    empty_months.add(month)
+            if empty_months:
+                emptied |= Q(module_id=module_id, month__in=empty_months)
+        # empty buckets are deleted rather than zeroed, so cascading deletes of
+        # a module attribute or organization do not recreate its rows
+        if emptied:
+            ModuleActivityRollup.objects.filter(emptied).delete()
+        ModuleActivityRollups.save_counts(refreshed)
+
+    def refresh_for_users(user_ids):
+        buckets = set()
+        module_activities = ModuleActivity.objects.filter(
+            user_id__in=user_ids
+        ).values_list("module_id", "assigned_on", "complete_date")
+        for module_id, assigned_on, complete_date in module_activities:
+            buckets |= ModuleActivityRollups.get_buckets(
+                module_id, assigned_on, complete_date
+            )
+        ModuleActivityRollups.refresh(buckets)
+
+    def rebuild(organization_id=None):
+        module_activities = ModuleActivityRollups.get_live_activities()
+        rollups = ModuleActivityRollup.objects.all()
+        if organization_id is not None:
+            module_activities = module_activities.filter(
+                module__organization_id=organization_id
+            )
+            rollups = rollups.filter(organization_id=organization_id)
+
+        with transaction.atomic():
+            rollups.delete()
+            counts = ModuleActivityRollups.count_by_month(module_activities)
+            ModuleActivityRollups.save_counts(counts)
+        return len(counts)
+
+
+class ApplicationUsageCube:
+    """
+    Maintains DailyApplicationUsage rows, bucketing UserActivity by the local
+    date of its end time.
+    """
+
+    def add(organization_id, module_id, user_id, day, duration, sessions=1):
+        usage = DailyApplicationUsage.objects.filter(
+            organization_id=organization_id,
+            module_id=module_id,
+            user_id=user_id,
+            day=day,
+        )
+        increment = {
+            "total_duration": F("total_duration") + duration,
+            "sessions": F("sessions") + sessions,
+        }
+        if usage.update(**increment):
+            return
+        try:
+            with transaction.atomic():
+                DailyApplicationUsage.objects.create(
+                    organization_id=organization_id,
+                    module_id=module_id,
+                    user_id=user_id,
+                    day=day,
+                    total_duration=duration,
+                    sessions=sessions,
+                )
+        except IntegrityError:
+            # Created concurrently by another request for the same day
+            usage.update(**increment)
+
+    def record(user_activity, organization_id=None):
+        if organization_id is None:
+            organization_id = user_activity.user.organization_id
+        ApplicationUsageCube.add(
+            organization_id,
+            user_activity.module_id,
+            user_activity.user_id,
+            get_local_date(user_activity.end_time),
+            user_activity.duration,
+        )
+
+    def record_many(user_activities):
+        """
+        Records user activities created with bulk_create, upserting all the
+        daily rows in one statement. The activities' users must be loaded.
+        """
+        totals = defaultdict(lambda: [timedelta(), 0])
+        for user_activity in user_activities:
+            key = (
+                user_activity.user.organization_id,
+                user_activity.module_id,
+                user_activity.user_id,
+                get_local_date(user_activity.end_time),
+            )
+            totals[key][0] += user_activity.duration
+            totals[key][1] += 1
+
+        params = []
+        for key, (duration, sessions) in totals.items():
+            if key[0] is None:
+                # rows without an organization conflict on a partial unique
+                # constraint, ON CONFLICT below only names the full one
+                ApplicationUsageCube.add(*key, duration, sessions)
+            else:
+                params.extend([*key, duration, sessions])
+        if not params:
+            return
+        table = connection.ops.quote_name(DailyApplicationUsage._meta.db_table)
+        values = ", ".join(["(%s, %s, %s, %s, %s, %s)"] * (len(params) // 6))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {table}
+                    (organization_id, module_id, user_id, day, total_duration, sessions)
+                VALUES {values}
+                ON CONFLICT (organization_id, module_id, user_id, day) DO UPDATE SET
+                    total_duration = {table}.total_duration + EXCLUDED.total_duration,
+                    sessions = {table}.sessions + EXCLUDED.sessions
+                """,
+                params,
+            )
+
+    def rebuild(organization_id=None):
+        user_activities = UserActivity.objects.all()
+        usages = DailyApplicationUsage.objects.all()
+        if organization_id is not None:
+            user_activities = user_activities.filter(
+                user__organization_id=organization_id
+            )
+            usages = usages.filter(organization_id=organization_id)
+
+        totals = (
+            user_activities.annotate(day=TruncDate("end_time"))
+            .values("user__organization_id", "module_id", "user_id", "day")
+            .annotate(total_duration=Sum("duration"), sessions=Count("id"))
+            .order_by()
+        )
+        with transaction.atomic():
+            usages.delete()
+            created = DailyApplicationUsage.objects.bulk_create(
+                (
+                    DailyApplicationUsage(
+                        organization_id=total["user__organization_id"],
+                        module_id=total["module_id"],
+                        user_id=total["user_id"],
+                        day=total["day"],
+                        total_duration=total["total_duration"],
+                        sessions=total["sessions"],
+                    )
+                    for total in totals.iterator()
+                ),
+                batch_size=1000,
+            )
+        return len(created)
@@ -12,6 +12,9 @@ from .models import (
     Feedback,
     UserActivity,
 )
+from .utils import get_attempt_data
+from .telemetry import AttemptTelemetries
+from .downsampling import Downsampling, DECIMATION_METHODS
 from accounts.models import User
 from django.db.models import Sum, Count
 from datetime import datetime, timedelta
@@ -77,6 +80,15 @@ class OrganizationSerilaizer(serializers.ModelSerializer):
         fields = ["id", "name", "slug", "logo"]
 
 
+class ModuleAssignmentSerializer(serializers.Serializer):
+    user_ids = serializers.ListField(child=serializers.IntegerField())
+    module_ids = serializers.ListField(child=serializers.IntegerField())
+    assign = serializers.BooleanField(default=False)
+    # large cohorts are assigned by the assign_modules task, polled with
+    # assign-deassign/<task_id>/
+    background = serializers.BooleanField(default=False)
+
+
 class IndividualReportSerializer(serializers.Serializer):
     user_id = serializers.CharField()
     start_date = serializers.DateField()
@@ -384,6 +396,11 @@ class AttemptRetriveSerilaizer(serializers.Serializer):
     level = serializers.CharField()
     attempt = serializers.IntegerField(required=False)
     organization_id = serializers.IntegerField()
+    # optional cap on the points of each line graph
+    max_points = serializers.IntegerField(required=False, min_value=4)
+    downsampling = serializers.ChoiceField(
+        choices=DECIMATION_METHODS, required=False, default="lttb"
+    )
 
 
 class AttemptNameSerializer(serializers.ModelSerializer):
@@ -400,8 +417,9 @@ class BaseAttemptSerializer(serializers.ModelSerializer):
         fields = ["attempt_number", "duration", "start_time", "end_time", "result"]
 
     def get_result(self, instance):
-        if "passed" in instance.data:
-            return instance.data["passed"]
+        data = get_attempt_data(instance.data)
+        if "passed" in data:
+            return data["passed"]
         else:
             return False
 
@@ -415,9 +433,7 @@ class AttemptSerializer(serializers.ModelSerializer):
         fields = ["user", "data", "duration", "start_time", "end_time"]
 
     def get_user(self, instance):
-        user = instance.level_activity.module_activity.user
-        user = User.objects.get(id=user.id)
-        return user.get_full_name()
+        return instance.level_activity.module_activity.user.get_full_name()
 
     def get_graph_data(self, game_data, x, y, graph):
         fetch_route_x = x.split(".")
@@ -443,31 +459,32 @@ class AttemptSerializer(serializers.ModelSerializer):
         if additional_data is not None:
             additional_fields = self.get_additional_fields(additional_data)
 
-        last_added_time = None
         if info_x and info_y:
-            for i in range(0, len(info_x)):
-                current_time = round(float(info_x[i][x_label]), 2)
-                if last_added_time is None or (
-                    current_time - last_added_time >= 2
-                ):  # Adjusted to 2 seconds here
-                    co_ordinates.append(
-                        {
-                            "x": current_time,
-                            "y": round(float(info_y[i][y_label]), 2),
-                        }
-                    )
-                    last_added_time = current_time
+            times = Downsampling.round_2([float(point[x_label]) for point in info_x])
+            indices = Downsampling.spaced_indices(times)
+            values = Downsampling.round_2([float(info_y[i][y_label]) for i in indices])
+            kept = Downsampling.decimate(
+                times[indices],
+                values,
+                self.context.get("max_points"),
+                self.context.get("downsampling", "lttb"),
+            )
+            for position in kept:
+                i = indices[position]
+                co_ordinates.append(
+                    {"x": float(times[i]), "y": float(values[position])}
+                )
 
-                    for additional_field in additional_fields:
-                        list_to_append = additional_field["value_list"]
-                        value_to_append = info_x[i][additional_field["fetch_field"]]
-                        try:
-                            value_to_append = float(value_to_append)
-                            value_to_append = round(value_to_append, 2)
-                        except:
-                            pass  # do nothing
-                        list_to_append.append(value_to_append)
-                        additional_field["value_list"] = list_to_append
+                for additional_field in additional_fields:
+                    list_to_append = additional_field["value_list"]
+                    value_to_append = info_x[i][additional_field["fetch_field"]]
+                    try:
+                        value_to_append = float(value_to_append)
+                        value_to_append = round(value_to_append, 2)
+                    except:
+                        pass  # do nothing
+                    list_to_append.append(value_to_append)
+                    additional_field["value_list"] = list_to_append
 
         graph_obj = {
             "name": graph.get("name", ""),
@@ -557,11 +574,16 @@ class AttemptSerializer(serializers.ModelSerializer):
         return graph_obj
 
     def get_data(self, instance):
+        renders = self.context.get("renders", {})
+        if instance.id in renders:
+            return renders[instance.id]
+        return self.render_data(instance)
+
+    def render_data(self, instance):
         res = {}
-        if isinstance(instance.data, str):
-            json_data = json.loads(instance.data)
-        else:
-            json_data = instance.data
+        json_data = AttemptTelemetries.get_data(
+            instance, get_attempt_data(instance.data)
+        )
         game_data = json_data.get("gameData", None)
         if game_data is not None:
             score = json_data.get("score", None)
@@ -717,21 +739,10 @@ class AttemptSerializer(serializers.ModelSerializer):
                         else:
                             ideal_paths[k] = [d]
 
-                    actual_paths = {}
-                    for d in game_data["path"]["vehicleData"]:
-                        k = d["path"]
-                        k = k.lower() if k else "unknown"
-                        rounded_time_2_seconds = (
-                            round(float(d["time"]) / 2) * 2
-                        )  ### new code for path taking 2 sec
-                        if k in actual_paths:
-                            if rounded_time_2_seconds not in [
-                                round(float(item["time"]) / 2) * 2
-                                for item in actual_paths[k]
-                            ]:
-                                actual_paths[k].append(d)
-                        else:
-                            actual_paths[k] = [d]
+                    # first point of every 2 seconds of each path
+                    actual_paths = Downsampling.group_path_points(
+                        game_data["path"]["vehicleData"]
+                    )
                     # if "path-1" in actual_paths:
                     #     del actual_paths["path-1"]
                     paths = {"ideal_path": ideal_paths, "actual_path": actual_paths}
@@ -904,6 +915,19 @@ class AttemptWiseReportSerializer(serializers.ModelSerializer):
         ]
 
 
+class AttemptWiseSummarySerializer(AttemptWiseReportSerializer):
+    user_id = serializers.CharField(required=False)
+    user_ids = serializers.ListField(child=serializers.CharField(), required=False)
+
+    class Meta(AttemptWiseReportSerializer.Meta):
+        fields = AttemptWiseReportSerializer.Meta.fields + ["user_ids"]
+
+    def validate(self, attrs):
+        if not attrs.get("user_id") and not attrs.get("user_ids"):
+            raise serializers.ValidationError("user_id or user_ids is required")
+        return attrs
+
+
 class AttemptWiseReportTableSerializer(serializers.ModelSerializer):
     category_filter = serializers.CharField()
     start_date = serializers.CharField(required=False)
@@ -924,6 +948,17 @@ class AttemptWiseReportTableSerializer(serializers.ModelSerializer):
         ]
 
 
+class TopMistakesSerializer(serializers.Serializer):
+    organization_id = serializers.IntegerField(required=True)
+    module_names = serializers.ListField(required=False)
+    user_id = serializers.CharField(required=False)
+    start_date = serializers.CharField(required=False)
+    end_date = serializers.CharField(required=False)
+    limit = serializers.IntegerField(
+        required=False, default=10, min_value=1, max_value=100
+    )
+
+
 class ApplicationUsageSerializer(serializers.ModelSerializer):
     organization_id = serializers.IntegerField(required=True)
 
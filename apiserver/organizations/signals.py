@@ -0,0 +1,147 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from accounts.models import User
+from organizations.cache import AnalyticsCache
+from organizations.models import (
+    Attempt,
+    AttemptRender,
+    LevelActivity,
+    Module,
+    ModuleActivity,
+    ModuleAttributes,
+    Organization,
+    UserActivity,
+)
+from organizations.rollups import ModuleActivityRollups
+
+ROLLUP_USER_FIELDS = {"active", "deleted", "organization"}
+
+
+@receiver(pre_save, sender=ModuleActivity)
+def stash_module_activity_buckets(sender, instance, raw=False, **kwargs):
+    instance._rollup_buckets = set()
+    if raw or instance.pk is None:
+        return
+    previous = (
+        ModuleActivity.objects.filter(pk=instance.pk)
+        .values_list("module_id", "assigned_on", "complete_date")
+        .first()
+    )
+    if previous is not None:
+        instance._rollup_buckets = ModuleActivityRollups.get_buckets(*previous)
+
+
+@receiver(post_save, sender=ModuleActivity)
+@receiver(post_delete, sender=ModuleActivity)
+def refresh_module_activity_rollups(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    buckets = getattr(instance, "_rollup_buckets", set())
+    buckets |= ModuleActivityRollups.get_buckets(
+        instance.module_id, instance.assigned_on, instance.complete_date
+    )
+    ModuleActivityRollups.refresh(buckets)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def refresh_user_rollups(sender, instance, created, raw=False, **kwargs):
+    update_fields = kwargs.get("update_fields")
+    if raw or created:
+        return
+    if update_fields is not None and not ROLLUP_USER_FIELDS & set(update_fields):
+        return
+    ModuleActivityRollups.refresh_for_users([instance.pk])
+
+
+@receiver(pre_save, sender=ModuleAttributes)
+def drop_stale_attempt_renders(sender, instance, raw=False, **kwargs):
+    # renders show the passing score of the module
+    if raw or instance.pk is None:
+        return
+    previous = (
+        ModuleAttributes.objects.filter(pk=instance.pk)
+        .values_list("passing_score", flat=True)
+        .first()
+    )
+    if previous != instance.passing_score:
+        AttemptRender.objects.filter(
+            attempt__level_activity__module_activity__module=instance
+        ).delete()
+
+
+# the analytics cache is invalidated per organization, writes made with
+# bulk_create or update() invalidate it where they are made
+
+
+@receiver(post_save, sender=Attempt)
+@receiver(post_delete, sender=Attempt)
+def invalidate_attempt_analytics(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    organization_id = instance.organization_id
+    if organization_id is None:
+        # attempts recorded before the summary columns
+        organization_id = (
+            LevelActivity.objects.filter(pk=instance.level_activity_id)
+            .values_list("module_activity__module__organization_id", flat=True)
+            .first()
+        )
+    AnalyticsCache.invalidate([organization_id])
+
+
+@receiver(post_save, sender=ModuleActivity)
+@receiver(post_delete, sender=ModuleActivity)
+def invalidate_module_activity_analytics(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    AnalyticsCache.invalidate(
+        ModuleAttributes.objects.filter(pk=instance.module_id).values_list(
+            "organization_id", flat=True
+        )
+    )
+
+
+@receiver(post_save, sender=UserActivity)
+@receiver(post_delete, sender=UserActivity)
+def invalidate_user_activity_analytics(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    AnalyticsCache.invalidate(
+        User.objects.filter(pk=instance.user_id).values_list(
+            "organization_id", flat=True
+        )
+    )
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+@receiver(post_save, sender=ModuleAttributes)
+@receiver(post_delete, sender=ModuleAttributes)
+def invalidate_organization_analytics(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    AnalyticsCache.invalidate([instance.organization_id])
+
+
+@receiver(post_save, sender=Organization)
+@receiver(post_delete, sender=Organization)
+def invalidate_changed_organization_analytics(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    AnalyticsCache.invalidate([instance.id])
+
+
+@receiver(post_save, sender=Module)
+@receiver(post_delete, sender=Module)
+def invalidate_module_analytics(sender, instance, raw=False, **kwargs):
+    # the organizations assigned the module. On delete its module attributes
+    # are deleted first, and invalidate their organizations themselves
+    if raw:
+        return
+    AnalyticsCache.invalidate(
+        ModuleAttributes.objects.filter(module=instance).values_list(
+            "organization_id", flat=True
+        )
+    )
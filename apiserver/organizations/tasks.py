@@ -0,0 +1,137 @@
+import copy
+import logging
+from datetime import timedelta
+
+from celery import shared_task
+from django.db import OperationalError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from organizations.assignments import ModuleAssignments
+from organizations.cache import AnalyticsCache
+from organizations.ingestion import AttemptIngestion
+from organizations.models import AttemptIngest
+from organizations.renders import AttemptRenders
+
+logger = logging.getLogger(__name__)
+
+# an ingest still pending this long after it was last tried lost its task
+# (worker restart, broker outage) and is queued again by
+# requeue_pending_attempt_ingests
+STALE_INGEST_AGE = timedelta(minutes=10)
+INGEST_MAX_RETRIES = 5
+# attempts after which a pending ingest is marked failed instead of being
+# queued again, two runs of process_attempt_ingest with all their retries
+MAX_INGEST_ATTEMPTS = 2 * (INGEST_MAX_RETRIES + 1)
+
+
+# progress is tracked on AttemptIngest itself, so no result is stored
+@shared_task(
+    ignore_result=True,
+    autoretry_for=(OperationalError,),
+    retry_backoff=True,
+    max_retries=INGEST_MAX_RETRIES,
+)
+def process_attempt_ingest(ingest_id):
+    # counted before the transaction below, so attempts it rolls back on a
+    # database error are counted too
+    AttemptIngest.objects.filter(id=ingest_id, status=AttemptIngest.PENDING).update(
+        retries=F("retries") + 1, updated_at=timezone.now()
+    )
+    with transaction.atomic():
+        ingest = AttemptIngest.objects.select_for_update().get(id=ingest_id)
+        if ingest.status == AttemptIngest.COMPLETED:
+            logger.info(f"attempt ingest {ingest_id} already completed")
+            return str(ingest.attempt_id)
+        if ingest.retries > MAX_INGEST_ATTEMPTS:
+            logger.warning(f"gave up on attempt ingest {ingest_id}")
+            give_up_attempt_ingests(AttemptIngest.objects.filter(id=ingest_id))
+            return None
+
+        try:
+            with transaction.atomic():
+                attempt = AttemptIngestion.ingest(copy.deepcopy(ingest.payload))
+        except OperationalError:
+            raise
+        except Exception as e:
+            logger.exception(f"attempt ingest {ingest_id} failed")
+            ingest.status = AttemptIngest.FAILED
+            ingest.error = f"{type(e).__name__}: {e}"
+            ingest.save(update_fields=["status", "error", "updated_at"])
+            return None
+
+        transaction.on_commit(lambda: enqueue_attempt_renders([attempt.id]))
+        ingest.status = AttemptIngest.COMPLETED
+        ingest.attempt = attempt
+        ingest.error = ""
+        ingest.save(update_fields=["status", "attempt", "error", "updated_at"])
+        logger.info(f"attempt ingest {ingest_id} completed")
+        return str(attempt.id)
+
+
+@shared_task(ignore_result=True)
+def requeue_pending_attempt_ingests():
+    stale_ingests = AttemptIngest.objects.filter(
+        status=AttemptIngest.PENDING,
+        updated_at__lt=timezone.now() - STALE_INGEST_AGE,
+    )
+    failed = give_up_attempt_ingests(
+        stale_ingests.filter(retries__gte=MAX_INGEST_ATTEMPTS)
+    )
+    if failed:
+        logger.warning(f"gave up on {failed} attempt ingests")
+    ingest_ids = list(
+        stale_ingests.filter(retries__lt=MAX_INGEST_ATTEMPTS).values_list(
+            "id", flat=True
+        )
+    )
+    for ingest_id in ingest_ids:
+        process_attempt_ingest.delay(str(ingest_id))
+    return len(ingest_ids)
+
+
+def give_up_attempt_ingests(ingests):
+    return ingests.update(
+        status=AttemptIngest.FAILED,
+        error=f"Gave up after {MAX_INGEST_ATTEMPTS} attempts",
+        updated_at=timezone.now(),
+    )
+
+
+@shared_task(ignore_result=True)
+def render_attempts(attempt_ids):
+    rendered = AttemptRenders.refresh(attempt_ids)
+    logger.info(f"rendered {rendered} attempts")
+    return rendered
+
+
+def enqueue_attempt_renders(attempt_ids):
+    # attempts without a render are rendered when first read, so a broker
+    # outage only costs that first read
+    try:
+        render_attempts.apply_async((attempt_ids,), retry=False)
+    except Exception:
+        logger.exception(f"could not enqueue render of attempts {attempt_ids}")
+
+
+@shared_task(ignore_result=True)
+def refresh_analytics(name, params):
+    AnalyticsCache.refresh(name, params)
+
+
+@shared_task(bind=True)
+def assign_modules(self, user_ids, module_ids, assign):
+    # progress goes to the result backend, as the module activities are
+    # only visible in the database once the whole assignment commits
+    def report_progress(processed, total):
+        self.update_state(
+            state="PROGRESS", meta={"processed": processed, "total": total}
+        )
+
+    if assign:
+        assigned = ModuleAssignments.assign(user_ids, module_ids, report_progress)
+        logger.info(f"assigned {assigned} module activities")
+        return {"assigned": assigned}
+    deassigned = ModuleAssignments.deassign(user_ids, module_ids, report_progress)
+    logger.info(f"deassigned {deassigned} module activities")
+    return {"deassigned": deassigned}
@@ -0,0 +1,92 @@
+import json
+
+from organizations.models import Attempt, AttemptTelemetry
+
+# gameData keys kept on Attempt.data even when a graph plots them, as the
+# reports read them without rendering the attempt
+SUMMARY_KEYS = {
+    "mistakes",
+    "kpis",
+    "generalkpis",
+    "tableKpis",
+    "inspections",
+    "graph",
+}
+
+
+class AttemptTelemetries:
+    """
+    Splits the large time series of an attempt payload into AttemptTelemetry
+    and merges them back when the attempt is rendered.
+    """
+
+    def get_graph_routes(graph):
+        routes = []
+        for axis in ("xAxis", "yAxis"):
+            if isinstance(graph.get(axis), list):
+                routes.extend(graph[axis])
+            else:
+                routes.append(graph.get(axis))
+        routes.append(graph.get("label"))
+        data = graph.get("data")
+        if isinstance(data, str):
+            try:
+                # pie and kpi graphs can carry their values inline
+                json.loads(data.replace("'", '"'))
+            except json.JSONDecodeError:
+                routes.append(data)
+        for dataset in graph.get("datasets", []):
+            routes.append(dataset.get("data"))
+            routes.append(dataset.get("label"))
+        for additional_data in graph.get("additionalData") or []:
+            routes.append(additional_data.get("data"))
+        return [route for route in routes if isinstance(route, str) and "." in route]
+
+    def get_telemetry_keys(game_data):
+        keys = set()
+        if "path" in game_data:
+            keys.add("path")
+        for graph in game_data.get("graph") or []:
+            for route in AttemptTelemetries.get_graph_routes(graph):
+                keys.add(route.split(".")[0])
+        return {key for key in keys if key in game_data and key not in SUMMARY_KEYS}
+
+    def split(data):
+        """
+        Returns the attempt data without its time series, and the gameData
+        keys holding them (None when there are none).
+        """
+        game_data = data.get("gameData", None)
+        if not isinstance(game_data, dict):
+            return data, None
+        keys = AttemptTelemetries.get_telemetry_keys(game_data)
+        if not keys:
+            return data, None
+        summary = dict(data)
+        summary["gameData"] = {
+            key: value for key, value in game_data.items() if key not in keys
+        }
+        return summary, {key: game_data[key] for key in keys}
+
+    def get_data(attempt, data):
+        """
+        Returns the attempt data with its time series merged back in. Only
+        this loads AttemptTelemetry.
+        """
+        try:
+            telemetry = attempt.telemetry
+        except AttemptTelemetry.DoesNotExist:
+            return data
+        data = dict(data)
+        data["gameData"] = {**data.get("gameData", {}), **telemetry.game_data}
+        return data
+
+    def split_attempt(attempt, data):
+        summary, telemetry = AttemptTelemetries.split(data)
+        if telemetry is not None:
+            AttemptTelemetry.objects.update_or_create(
+                attempt=attempt, defaults={"game_data": telemetry}
+            )
+            Attempt.objects.filter(id=attempt.id).update(data=summary)
+            attempt.data = summary
+        return telemetry is not None
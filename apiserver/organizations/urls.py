@@ -2,6 +2,7 @@ from django.urls import path
 from .views import (
     OrgModulesApiView,
     ModuleAssignmentView,
+    ModuleAssignmentStatusView,
     ActiveModulesCountView,
     ActiveUsersCountView,
     OrganizationListView,
@@ -9,6 +10,9 @@ from .views import (
     PerformanceView,
     CompleteModuleView,
     UserAttemptView,
+    UserAttemptBulkView,
+    UserAttemptIngestView,
+    UserAttemptIngestStatusView,
     AttemptDataApiView,
     ModuleLevelView,
     # LeaderBoardView,
@@ -27,11 +31,14 @@ from .views import (
     AdminOrganizationApplicationUsageAPIView,
     LevelUserInfo,
     PerformanceCharts,
+    TopMistakesAPIView,
+    AnalyticsCacheMetricsView,
 )
 
 urlpatterns = [
     path("modules/", OrgModulesApiView.as_view()),
     path("assign-deassign/", ModuleAssignmentView.as_view()),
+    path("assign-deassign/<uuid:task_id>/", ModuleAssignmentStatusView.as_view()),
     path("list/", OrganizationListView.as_view()),
     path("details/<slug:slug>/", OrganizationView.as_view()),
     path("module-analytics/", ActiveModulesCountView.as_view()),
@@ -40,6 +47,12 @@ urlpatterns = [
     path("calculate-performances/", PerformanceView.as_view()),
     path("application-usage/<int:usecase>/", ApplicationUsageApiView.as_view()),
     path("user-attempt-details/", UserAttemptView.as_view()),
+    path("user-attempt-details/bulk/", UserAttemptBulkView.as_view()),
+    path("user-attempt-ingest/", UserAttemptIngestView.as_view()),
+    path(
+        "user-attempt-ingest/<uuid:ingest_id>/",
+        UserAttemptIngestStatusView.as_view(),
+    ),
     path("attempt-data/", AttemptDataApiView.as_view()),
     path("user-assigned-module-level/", ModuleLevelView.as_view()),
     # path("leader-board/", LeaderBoardView.as_view()),
@@ -54,6 +67,7 @@ urlpatterns = [
     path("attempt-wise-report/", AttemptWiseReportAPIView.as_view()),
     path("attempt-wise-report-table/", AttemptWiseReportTableAPIView.as_view()),
     path("performance-charts/", PerformanceCharts.as_view()),
+    path("top-mistakes/", TopMistakesAPIView.as_view()),
     path(
         "application-usage-analytics/<int:usecase>/",
         ApplicationUsageAnalyticsAPIView.as_view(),
@@ -66,4 +80,5 @@ urlpatterns = [
         "admin-organization-application-usage/",
         AdminOrganizationApplicationUsageAPIView.as_view(),
     ),
+    path("analytics-cache-metrics/", AnalyticsCacheMetricsView.as_view()),
 ]
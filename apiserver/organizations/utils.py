@@ -1,13 +1,23 @@
 from datetime import datetime, timedelta, timezone
 import calendar
-from django.db.models import Count, F, Case, When, Value, IntegerField, Sum, Q
-from django.db.models.functions import TruncMonth, Coalesce
+from django.db.models import F, Sum, Q
+from django.db.models.functions import Coalesce
 from organizations.models import *
 from dateutil.relativedelta import relativedelta
-from django.db.models import Sum
 from django.db.models.functions import Extract
 import math
-from collections import defaultdict
+import json
+
+
+def get_attempt_data(data):
+    """
+    Returns Attempt.data as a dict. Attempts recorded before data was stored
+    as a JSON object hold a JSON encoded string until the convert_attempt_data
+    command has run.
+    """
+    if isinstance(data, str):
+        return json.loads(data)
+    return data
 
 
 class PerformanceCalculations:
@@ -56,15 +66,10 @@ class PerformanceCalculations:
             current_month, current_year
         )
         module_attribute_query = Q(organization=organization)
-        module_activity_query = Q(
-            user__organization=organization,
-            user__deleted=False,
-            user__active=True,
-            active=True,
-        )
+        rollup_query = Q(organization=organization)
         if module:
             module_attribute_query &= Q(module=module)
-            module_activity_query &= Q(module__module=module)
+            rollup_query &= Q(module__module=module)
         module_attribute = ModuleAttributes.objects.filter(
             module_attribute_query
         ).select_related("module")
@@ -72,7 +77,7 @@ class PerformanceCalculations:
             PerformanceCalculations.calculate_completion_rate(
                 current_month=current_month,
                 current_year=current_year,
-                module_activity_query=module_activity_query,
+                rollup_query=rollup_query,
             )
         )
 
@@ -80,7 +85,7 @@ class PerformanceCalculations:
             PerformanceCalculations.calculate_completion_rate(
                 current_month=last_month,
                 current_year=last_month_year,
-                module_activity_query=module_activity_query,
+                rollup_query=rollup_query,
             )
         )
 
@@ -140,122 +145,81 @@ class PerformanceCalculations:
                 - previous_month_completion_rate["completed_users"]
             )
             data["completion_rate_chart"] = module_completion_rate_chart
-            data["monthly_counts"] = {}
-
-            for module in module_attribute:
-                organization_creation = organization.created_at
-                name = module.module.name
-
-                while organization_creation <= datetime.now(timezone.utc):
-                    assigned_count = ModuleActivity.objects.filter(
-                        module_activity_query,
-                        module__module__name=name,
-                        assigned_on__month__lte=organization_creation.month,
-                    ).count()
-
-                    completed_count = ModuleActivity.objects.filter(
-                        module_activity_query,
-                        module__module__name=name,
-                        complete=True,
-                        complete_date__month__lte=organization_creation.month,
-                    ).count()
-
-                    completion_rate = (
-                        (round(completed_count / assigned_count * 100, 2))
-                        if assigned_count > 0
-                        else 0
-                    )
-                    if float(completion_rate).is_integer():
-                        completion_rate = int(completion_rate)
-                    if name not in data["monthly_counts"]:
-                        data["monthly_counts"][name] = {}
-                    data["monthly_counts"][name][
-                        calendar.month_name[organization_creation.month]
-                    ] = completion_rate
-                    organization_creation += relativedelta(months=1)
+            data[
+                "monthly_counts"
+            ] = PerformanceCalculations.get_monthly_completion_rates(
+                organization, module_attribute, rollup_query
+            )
         return data
 
+    def get_monthly_completion_rates(organization, module_attribute, rollup_query):
+        months = []
+        organization_creation = organization.created_at
+        while organization_creation <= datetime.now(timezone.utc):
+            if organization_creation.month not in months:
+                months.append(organization_creation.month)
+            organization_creation += relativedelta(months=1)
+
+        # One conditional sum per calendar month, grouped by module
+        aggregates = {}
+        for month in months:
+            aggregates["assigned_{}".format(month)] = Coalesce(
+                Sum("active", filter=Q(month__month__lte=month)), 0
+            )
+            aggregates["completed_{}".format(month)] = Coalesce(
+                Sum("completed", filter=Q(month__month__lte=month)), 0
+            )
+
+        module_counts = {}
+        if aggregates:
+            module_counts = {
+                counts["module__module__name"]: counts
+                for counts in ModuleActivityRollup.objects.filter(rollup_query)
+                .values("module__module__name")
+                .annotate(**aggregates)
+                .order_by()
+            }
+
+        monthly_counts = {}
+        for module in module_attribute:
+            name = module.module.name
+            counts = module_counts.get(name, {})
+            for month in months:
+                assigned_count = counts.get("assigned_{}".format(month), 0)
+                completed_count = counts.get("completed_{}".format(month), 0)
+                completion_rate = (
+                    (round(completed_count / assigned_count * 100, 2))
+                    if assigned_count > 0
+                    else 0
+                )
+                if float(completion_rate).is_integer():
+                    completion_rate = int(completion_rate)
+                if name not in monthly_counts:
+                    monthly_counts[name] = {}
+                monthly_counts[name][calendar.month_name[month]] = completion_rate
+        return monthly_counts
+
     def calculate_performance_trends(module_attribute, current_month, current_year):
         last_month, last_month_year = PerformanceCalculations.get_previous_month(
             current_month, current_year
         )
-
-        data = (
-            module_attribute.annotate(
-                current_month_assigned=Sum(
-                    Case(
-                        When(
-                            model_attributes__assigned_on__month=current_month,
-                            model_attributes__assigned_on__year=current_year,
-                            model_attributes__user__deleted=False,
-                            model_attributes__user__active=True,
-                            model_attributes__active=True,
-                            then=1,
-                        ),
-                        default=Value(0),
-                        output_field=IntegerField(),
-                    )
-                ),
-                current_month_complete=Sum(
-                    Case(
-                        When(
-                            model_attributes__complete_date__month=current_month,
-                            model_attributes__complete_date__year=current_year,
-                            model_attributes__complete=True,
-                            model_attributes__user__deleted=False,
-                            model_attributes__user__active=True,
-                            model_attributes__active=True,
-                            then=1,
-                        ),
-                        default=Value(0),
-                        output_field=IntegerField(),
-                    )
-                ),
-                last_month_assigned=Sum(
-                    Case(
-                        When(
-                            model_attributes__assigned_on__month__lte=last_month,
-                            model_attributes__assigned_on__year__lte=last_month_year,
-                            model_attributes__user__deleted=False,
-                            model_attributes__user__active=True,
-                            model_attributes__active=True,
-                            then=1,
-                        ),
-                        default=Value(0),
-                        output_field=IntegerField(),
-                    )
-                ),
-                last_month_complete=Sum(
-                    Case(
-                        When(
-                            model_attributes__complete_date__month__lte=last_month,
-                            model_attributes__complete_date__year__lte=last_month_year,
-                            model_attributes__complete=True,
-                            model_attributes__user__deleted=False,
-                            model_attributes__user__active=True,
-                            model_attributes__active=True,
-                            then=1,
-                        ),
-                        default=Value(0),
-                        output_field=IntegerField(),
-                    )
-                ),
-            )
-        ).values(
-            "current_month_assigned",
-            "current_month_complete",
-            "last_month_assigned",
-            "last_month_complete",
+        current_month_query = Q(month__month=current_month, month__year=current_year)
+        last_month_query = Q(
+            month__month__lte=last_month, month__year__lte=last_month_year
         )
 
-        monthly_trends = {}
-
-        for item in data:
-            for key, value in item.items():
-                if key not in monthly_trends:
-                    monthly_trends[key] = value
-                else:
-                    monthly_trends[key] += value
+        monthly_trends = ModuleActivityRollup.objects.filter(
+            module__in=module_attribute
+        ).aggregate(
+            current_month_assigned=Coalesce(
+                Sum("active", filter=current_month_query), 0
+            ),
+            current_month_complete=Coalesce(
+                Sum("completed", filter=current_month_query), 0
+            ),
+            last_month_assigned=Coalesce(Sum("active", filter=last_month_query), 0),
+            last_month_complete=Coalesce(Sum("completed", filter=last_month_query), 0),
+        )
 
         # Calculate pending users
         pending_users = monthly_trends["current_month_assigned"] + (
@@ -296,75 +260,28 @@ class PerformanceCalculations:
                 last_quarter_end_date,
             ) = PerformanceCalculations.get_quarter_dates(quarter_num - 1)
 
-            quarterly_trends = (
-                module_attribute.annotate(
-                    current_quarter_assigned=Sum(
-                        Case(
-                            When(
-                                model_attributes__assigned_on__gte=quarter_start_date,
-                                model_attributes__assigned_on__lte=quarter_end_date,
-                                model_attributes__user__deleted=False,
-                                model_attributes__user__active=True,
-                                model_attributes__active=True,
-                                then=1,
-                            ),
-                            default=Value(0),
-                            output_field=IntegerField(),
-                        )
-                    ),
-                    current_quarter_complete=Sum(
-                        Case(
-                            When(
-                                model_attributes__complete_date__gte=quarter_start_date,
-                                model_attributes__complete_date__lte=quarter_end_date,
-                                model_attributes__user__deleted=False,
-                                model_attributes__user__active=True,
-                                model_attributes__active=True,
-                                model_attributes__complete=True,
-                                then=1,
-                            ),
-                            default=Value(0),
-                            output_field=IntegerField(),
-                        )
-                    ),
-                    previous_quarter_assigned=Sum(
-                        Case(
-                            When(
-                                model_attributes__assigned_on__gte=last_quarter_start_date,
-                                model_attributes__assigned_on__lte=last_quarter_end_date,
-                                model_attributes__user__deleted=False,
-                                model_attributes__user__active=True,
-                                model_attributes__active=True,
-                                then=1,
-                            ),
-                            default=Value(0),
-                            output_field=IntegerField(),
-                        )
-                    ),
-                    previous_quarter_complete=Sum(
-                        Case(
-                            When(
-                                model_attributes__complete_date__gte=last_quarter_start_date,
-                                model_attributes__complete_date__lte=last_quarter_end_date,
-                                model_attributes__complete=True,
-                                model_attributes__user__deleted=False,
-                                model_attributes__user__active=True,
-                                model_attributes__active=True,
-                                then=1,
-                            ),
-                            default=Value(0),
-                            output_field=IntegerField(),
-                        )
-                    ),
-                )
-            ).values(
-                "current_quarter_complete",
-                "current_quarter_assigned",
-                "previous_quarter_assigned",
-                "previous_quarter_complete",
-            )[
-                0
-            ]
+            current_quarter_query = Q(
+                month__gte=quarter_start_date, month__lte=quarter_end_date
+            )
+            previous_quarter_query = Q(
+                month__gte=last_quarter_start_date, month__lte=last_quarter_end_date
+            )
+            quarterly_trends = ModuleActivityRollup.objects.filter(
+                module__in=module_attribute
+            ).aggregate(
+                current_quarter_assigned=Coalesce(
+                    Sum("active", filter=current_quarter_query), 0
+                ),
+                current_quarter_complete=Coalesce(
+                    Sum("completed", filter=current_quarter_query), 0
+                ),
+                previous_quarter_assigned=Coalesce(
+                    Sum("active", filter=previous_quarter_query), 0
+                ),
+                previous_quarter_complete=Coalesce(
+                    Sum("completed", filter=previous_quarter_query), 0
+                ),
+            )
 
             # Calculate pending users
             pending_users = (
@@ -390,23 +307,13 @@ class PerformanceCalculations:
 
         return all_quarters_performance
 
-    def calculate_completion_rate(current_month, current_year, module_activity_query):
-        completion_rate = ModuleActivity.objects.filter(
-            module_activity_query
-        ).aggregate(
-            total_users=Count("user"),
+    def calculate_completion_rate(current_month, current_year, rollup_query):
+        completion_rate = ModuleActivityRollup.objects.filter(rollup_query).aggregate(
+            total_users=Coalesce(Sum("active"), 0),
             completed_users=Coalesce(
                 Sum(
-                    Case(
-                        When(
-                            complete=True,
-                            complete_date__month__lte=current_month,
-                            complete_date__year=current_year,
-                            then=1,
-                        ),
-                        default=0,
-                        output_field=IntegerField(),
-                    )
+                    "completed",
+                    filter=Q(month__month__lte=current_month, month__year=current_year),
                 ),
                 0,
             ),
@@ -416,7 +323,7 @@ class PerformanceCalculations:
 
 
 class ApplicationUsage:
-    def get_module_application_usage(user_activity):
+    def get_module_application_usage(usage):
         data = {}
         intervals = {
             "all": None,
@@ -424,17 +331,17 @@ class ApplicationUsage:
             "6m": relativedelta(months=6),
             "1y": relativedelta(years=1),
         }
-        duration_by_module = user_activity.values("module__name").annotate(
-            total_duration=Sum("duration")
+        duration_by_module = usage.values("module__name").annotate(
+            total_duration=Sum("total_duration")
         )
 
         for interval, delta in intervals.items():
             if delta:
-                end_time = datetime.now() - delta
+                start_day = (datetime.now() - delta).date()
                 duration = (
-                    user_activity.filter(end_time__gte=end_time)
+                    usage.filter(day__gte=start_day)
                     .values("module__name")
-                    .annotate(total_duration=Sum("duration"))
+                    .annotate(total_duration=Sum("total_duration"))
                 )
             else:
                 duration = duration_by_module
@@ -453,14 +360,14 @@ class ApplicationUsage:
 
         return data
 
-    def get_organization_application_usage(user_activity, organization=None):
+    def get_organization_application_usage(usage, organization=None):
         if organization:
             current_year = datetime.now().year
             current_month = datetime.now().month
             monthly = list(
-                user_activity.annotate(month=Extract("end_time", "month"))
+                usage.annotate(month=Extract("day", "month"))
                 .values("month")
-                .annotate(total_duration=Sum("duration"))
+                .annotate(total_duration=Sum("total_duration"))
                 .order_by("month")
             )[-12:]
 
@@ -486,10 +393,10 @@ class ApplicationUsage:
 
             quarter_dict = {}
             quarterly = (
-                user_activity.filter(end_time__year=current_year)
-                .annotate(quarter=Extract("end_time", "quarter"))
+                usage.filter(day__year=current_year)
+                .annotate(quarter=Extract("day", "quarter"))
                 .values("quarter")
-                .annotate(total_duration=Sum("duration"))
+                .annotate(total_duration=Sum("total_duration"))
             ).order_by("quarter")
 
             if organization.created_at.month <= 3:
@@ -523,10 +430,10 @@ class ApplicationUsage:
                     ] = total_duration.total_seconds()
 
             yearly = (
-                user_activity.filter(end_time__month__gte=organization.created_at.month)
-                .annotate(year=Extract("end_time", "year"))
+                usage.filter(day__month__gte=organization.created_at.month)
+                .annotate(year=Extract("day", "year"))
                 .values("year")
-                .annotate(total_duration=Sum("duration"))
+                .annotate(total_duration=Sum("total_duration"))
             ).order_by("year")
 
             year_dict = {}
@@ -540,19 +447,19 @@ class ApplicationUsage:
             }
         else:
             monthly_total_time_by_organization = (
-                user_activity.annotate(month=Extract("end_time", "month"))
+                usage.annotate(month=Extract("day", "month"))
                 .values("month")
-                .annotate(total_duration=Sum("duration"))
+                .annotate(total_duration=Sum("total_duration"))
             ).order_by("month")
             quarterly_total_time_by_organization = (
-                user_activity.annotate(quarter=Extract("end_time", "quarter"))
+                usage.annotate(quarter=Extract("day", "quarter"))
                 .values("quarter")
-                .annotate(total_duration=Sum("duration"))
+                .annotate(total_duration=Sum("total_duration"))
             ).order_by("quarter")
             yearly_total_time_by_organization = (
-                user_activity.annotate(year=Extract("end_time", "year"))
+                usage.annotate(year=Extract("day", "year"))
                 .values("year")
-                .annotate(total_duration=Sum("duration"))
+                .annotate(total_duration=Sum("total_duration"))
             ).order_by("year")
 
             monthly_dict = {
@@ -3,6 +3,7 @@
 # Create your views here.
 import logging
 from rest_framework.views import APIView
+from rest_framework.parsers import JSONParser
 from rest_framework.exceptions import ValidationError
 from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.response import Response
@@ -18,9 +19,9 @@ from datetime import datetime, date, timedelta
 from dateutil.relativedelta import relativedelta
 from rest_framework import filters
 from rest_framework import serializers
-import pytz
 import json
-from collections import Counter
+import hashlib
+from collections import Counter, defaultdict
 
 
 from rest_framework.generics import (
@@ -28,23 +29,34 @@ from rest_framework.generics import (
 )
 from .models import (
     Organization,
-    Category,
     Module,
     Level,
     ModuleAttributes,
     ModuleActivity,
     LevelActivity,
     Attempt,
+    AttemptMistake,
     UserActivity,
+    DailyApplicationUsage,
+    AttemptIngest,
 )
+from .ingestion import AttemptIngestion
+from .parsers import NDJSONParser
+from .cache import AnalyticsCache
+from .renders import AttemptRenders
+from .assignments import ModuleAssignments
+from .tasks import assign_modules, enqueue_attempt_renders, process_attempt_ingest
 
 from accounts.models import User
 from accounts.views import IsOrgOwnerOrStaff, IsAdmin
-from django.db.models.functions import TruncMonth, Coalesce
+from django.db.models.functions import TruncMonth, Coalesce, Cast
 import calendar
+from bisect import bisect_left, bisect_right
+from django.utils.timezone import localtime
 from .serializers import (
     ModuleActivityForPerformanceSerializer,
     ModuleAttributesSerializer,
+    ModuleAssignmentSerializer,
     OrganizationSerilaizer,
     AttemptSerializer,
     LevelSerializer,
@@ -56,7 +68,9 @@ from .serializers import (
     AttemptNameSerializer,
     AttemptReportSerializer,
     AttemptWiseReportSerializer,
+    AttemptWiseSummarySerializer,
     AttemptWiseReportTableSerializer,
+    TopMistakesSerializer,
     ApplicationUsageSerializer,
     ListLevelSerializer,
     PerformanceSerializer,
@@ -75,12 +89,16 @@ from django.db.models import (
     Subquery,
     OuterRef,
     Avg,
+    Min,
+    DecimalField,
 )
 from django.shortcuts import get_object_or_404
 
 
 logger = logging.getLogger(__name__)
 
+MAX_BULK_ATTEMPTS = 500
+
 
 class OrgModulesApiView(ListAPIView):
     queryset = ModuleAttributes.objects.all()
@@ -110,38 +128,47 @@ class ModuleAssignmentView(APIView):
     permission_classes = [IsOrgOwnerOrStaff]
 
     def post(self, request):
-        user_ids = self.request.data.get("user_ids", None)
-        module_ids = self.request.data.get("module_ids", None)
-        is_assign = self.request.data.get("assign", False)
-
-        users = User.objects.filter(id__in=user_ids)
-        modules = ModuleAttributes.objects.filter(id__in=module_ids)
-        existing = ModuleActivity.objects.filter(
-            user_id__in=user_ids, module_id__in=module_ids, active=True
-        )
+        serializer = ModuleAssignmentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user_ids = serializer.validated_data["user_ids"]
+        module_ids = serializer.validated_data["module_ids"]
+        is_assign = serializer.validated_data["assign"]
 
-        if is_assign:
-            for module in modules:
-                for user in users:
-                    if (
-                        existing.filter(
-                            user_id=user.id, module_id=module.id, active=True
-                        ).count()
-                        < 1
-                    ):
-                        ModuleActivity.objects.create(
-                            user=user,
-                            module=module,
-                            assigned_on=datetime.now(),
-                            active=True,
-                        )
+        if serializer.validated_data["background"]:
+            try:
+                result = assign_modules.apply_async(
+                    (user_ids, module_ids, is_assign), retry=False
+                )
+            except Exception:
+                logger.exception("could not enqueue module assignment")
+                return Response(
+                    status=503, data={"error": "Could not queue the assignment"}
+                )
+            return Response(
+                status=202, data={"task_id": result.id, "status": result.state}
+            )
 
+        if is_assign:
+            data = {"assigned": ModuleAssignments.assign(user_ids, module_ids)}
         else:
-            for module_activity in existing:
-                module_activity.active = False
-                module_activity.save()
+            data = {"deassigned": ModuleAssignments.deassign(user_ids, module_ids)}
+        return Response(status=201, data=data)
 
-        return Response(status=201)
+
+# api to get the progress of an assignment made with background
+class ModuleAssignmentStatusView(APIView):
+    permission_classes = [IsOrgOwnerOrStaff]
+
+    def get(self, request, task_id):
+        result = assign_modules.AsyncResult(str(task_id))
+        data = {"task_id": task_id, "status": result.state}
+        if result.state == "PROGRESS":
+            data.update(result.info)
+        elif result.successful():
+            data.update(result.result)
+        elif result.failed():
+            data["error"] = f"{type(result.result).__name__}: {result.result}"
+        return Response(status=200, data=data)
 
 
 class ActiveModulesCountView(generics.GenericAPIView):
@@ -194,6 +221,12 @@ class PerformanceView(APIView):
     serializer_class = PerformanceSerializer
     permission_classes = [IsOrgOwnerOrStaff]
 
+    def get_performance(organization_id, module_id=None, month=None):
+        # month only keys the cache, the performance is of the current month
+        organization = Organization.objects.get(id=organization_id)
+        module = Module.objects.get(id=module_id) if module_id else None
+        return PerformanceCalculations.get_module_performance(organization, module)
+
     def post(self, request):
         serializer = self.serializer_class(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -212,7 +245,12 @@ class PerformanceView(APIView):
                     status=400,
                     data={"error": "Invalid module name for the given organization"},
                 )
-        data = PerformanceCalculations.get_module_performance(organization, module)
+        data = AnalyticsCache.get(
+            "calculate-performances",
+            organization_id=organization.id,
+            module_id=module.id if module else None,
+            month=datetime.now().strftime("%Y-%m"),
+        )
         return Response(status=200, data=data)
 
 
@@ -227,246 +265,98 @@ class CompleteModuleView(APIView):
 # api to collect attempt data for a user assigned to a module
 class UserAttemptView(APIView):
     def post(self, request):
-        data = self.request.data
-        user_id = data["userId"]
-        org_id = data["orgId"]
-        user = None
-        try:
-            user = User.objects.get(organization_id=org_id, user_id=user_id)
-        except ObjectDoesNotExist:
-            logger.error(
-                f"User with user id {user_id} or organization id {org_id} not found"
-            )
+        attempt = AttemptIngestion.ingest(self.request.data)
+        transaction.on_commit(lambda: enqueue_attempt_renders([attempt.id]))
+        return Response(status=201)
 
-        module_name = data["module"]["name"]
-        level_name = data["module"]["level"]
-        logger.info(
-            f"get the module activity object given the module name as {module_name}"
-        )
-        try:
-            main_module = Module.objects.get(name__iexact=module_name)
-            module = ModuleAttributes.objects.get(
-                module__name__iexact=module_name, organization_id=org_id
-            )
-        except ObjectDoesNotExist:
-            logger.error(f"module {module_name} does not exist")
 
-        module_activity = ModuleActivity.objects.get(
-            user=user, module=module, active=True
-        )
+# api to collect a batch of attempts, sent as a json array or as ndjson
+class UserAttemptBulkView(APIView):
+    parser_classes = [JSONParser, NDJSONParser]
 
-        # just for now to add through api...remove later
-        logger.info(
-            f"get the level from level name {level_name} or create level activity if does not exist"
-        )
-        try:
-            category = Category.objects.get(name__iexact=data["module"]["category"])
-        except Category.DoesNotExist:
-            last_category = Category.objects.order_by("-order").last()
-            category_order = last_category.order + 1 if last_category else 1
-            category = Category(
-                name=data["module"]["category"].capitalize(), order=category_order
-            )
-            category.save()
-        all_levels = Level.objects.filter(module=module_activity.module.module)
-        logger.info("all levels fetched for the module")
-        try:
-            level_obj = all_levels.get(name__iexact=level_name)
-            level_obj.category = category
-            level_obj.save()
-        except Level.DoesNotExist:
-            last_level = (
-                Level.objects.filter(module=main_module).order_by("level").last()
+    def post(self, request):
+        payloads = self.request.data
+        if not isinstance(payloads, list):
+            return Response(
+                status=400, data={"error": "Expected a list of attempt details"}
             )
-            level_number = last_level.level + 1 if last_level else 1
-            level_obj = Level(
-                module=main_module,
-                name=level_name.capitalize(),
-                level=level_number,
-                category=category,
+        if len(payloads) > MAX_BULK_ATTEMPTS:
+            return Response(
+                status=400,
+                data={
+                    "error": f"A batch can have at most {MAX_BULK_ATTEMPTS} attempts"
+                },
             )
-            level_obj.save()
-        logger.info(f"level {level_name} fetched")
-        level_activity, created = LevelActivity.objects.get_or_create(
-            level=level_obj, module_activity=module_activity
-        )
-        logger.info("level activity fetched")
-
-        logger.info("mark the level as completed")
-        score = data.get("score", None)
-        if score is not None and module_name.lower() in ["reach truck", "forklift"]:
-            score = 0
-            free_score_kpi = {
-                "Choose to turn off the unit before get out of the MHE": 2
-            }
-            if (
-                "gameData" in data
-                and "inspections" in data["gameData"]
-                and data["gameData"]["inspections"]
-            ):
-                score_kpis = data["gameData"]["inspections"][0].get("actualFlow", [])
-            else:
-                score_kpis = []
-            for score_kpi in score_kpis:
-                if score_kpi in free_score_kpi:
-                    score = score + free_score_kpi[score_kpi]
-
-            fixed_table_kpis = {
-                "brake condition": 2,
-                "fork condition": 2,
-                "alert light condition": 1,
-                "camera condition": 1,
-                "tilt condition": 2,
-                "steer condition": 2,
-                "safety belt condition": 1,
-                "fire extiguisher condition": 1,
-                "rearviews mirror condition": 1,
-                "blue light condition": 1,
-                "horn condition": 1,
-                "main light condition": 2,
-            }
 
-            if not data["gameData"]["tableKpis"]:
-                score = score + sum(fixed_table_kpis.values())
-            else:
-                for table_kpi in data["gameData"]["tableKpis"]:
-                    if (
-                        "preCheckCondition" in table_kpi
-                        and table_kpi["preCheckCondition"].strip().lower()
-                        in fixed_table_kpis
-                        and table_kpi["hasChecked"] == True
-                    ):
-                        score = (
-                            score
-                            + fixed_table_kpis[
-                                table_kpi["preCheckCondition"].strip().lower()
-                            ]
-                        )
-
-            fixed_mistakes = {
-                "did not complete pre operation check": 2,
-                "drove over the speed limit": 3,
-                "engagement error": 2,
-                "did not lower forks after stacking": 2,
-                "did not horn while pedestrian in vicinity": 2,
-                "did not horn before starting the engine": 1,
-                "did not horn before moving forward": 1,
-                "did not horn before moving in reverse": 1,
-                "did not press horn when turning into aisles": 1,
-                "fork blending occured": 3,
-                "did not maintain forkheight above 15 cm": 1,
-                "stacking error": 3,
-                "did not fix the pallet postion": 2,
-                "did not report breakdown during pre ops check": 2,
-            }
-            if "mistakes" in data["gameData"]:
-                score = score + sum(fixed_mistakes.values())
-                for mistake in data["gameData"]["mistakes"]:
-                    if mistake["name"].strip().lower() in fixed_mistakes:
-                        score = score - fixed_mistakes[mistake["name"].strip().lower()]
-
-            if "path" in data["gameData"]:
-                ideal_total_time = 0
-                for ideal_time in data["gameData"]["path"]["idealTime"]:
-                    ideal_total_time = ideal_total_time + ideal_time["timeTaken"]
-
-                actual_total_time = 0
-                actual_paths = {}
-                for actual_path in data["gameData"]["path"]["vehicleData"]:
-                    if actual_path["path"].lower() != "path-1":
-                        if actual_path["path"].lower() not in actual_paths:
-                            actual_paths[actual_path["path"].lower()] = []
-                        actual_paths[actual_path["path"].lower()].append(actual_path)
-
-                for path in actual_paths:
-                    first = actual_paths[path][0]["time"]
-                    last = actual_paths[path][len(actual_paths[path]) - 1]["time"]
-                    actual_total_time = actual_total_time + (last - first)
-
-                diff = actual_total_time - ideal_total_time
-                ideal_10 = ideal_total_time * 10 / 100
-                if diff > 0 and diff > ideal_10:
-                    score = score + 5
-
-            score = score / 50 * 100
-            data["score"] = round(score, 2)
-            if module_name.lower() == "forklift":
-                level_activity.complete = True
-                level_activity.save()
-        if score is not None and module_name.lower() != "forklift":
-            if module.passing_score and float(score) < float(module.passing_score):
-                level_activity.complete = False
-            else:
-                level_activity.complete = True
-            level_activity.save()
-        tz = pytz.timezone("Asia/Kolkata")
-
-        logger.info("Create attempt data record")
-        last_attempt = (
-            Attempt.objects.filter(level_activity=level_activity)
-            .order_by("attempt_number")
-            .last()
-        )
-        attempt_number = last_attempt.attempt_number + 1 if last_attempt else 1
-        Attempt.objects.create(
-            level_activity=level_activity,
-            attempt_number=attempt_number,
-            data=json.dumps(data, sort_keys=False),
-            duration=data["duration"],
-            start_time=datetime.fromtimestamp(int(data["startTime"]), tz),
-            end_time=datetime.fromtimestamp(int(data["endTime"]), tz),
+        results = AttemptIngestion.ingest_many(payloads)
+        attempt_ids = [
+            result["attempt_id"] for result in results if result["status"] == "created"
+        ]
+        if attempt_ids:
+            transaction.on_commit(lambda: enqueue_attempt_renders(attempt_ids))
+        created = len(attempt_ids)
+        return Response(
+            status=200,
+            data={
+                "created": created,
+                "failed": len(results) - created,
+                "results": results,
+            },
         )
 
-        all_levels = Level.objects.filter(module=module_activity.module.module)
-        logger.info(
-            "Get all the training levels before the assessment levels if the attempt is for assessment level"
+
+# api to accept the attempt data from the headset and process it in the background
+class UserAttemptIngestView(APIView):
+    def post(self, request):
+        data = self.request.data
+        idempotency_key = self.request.headers.get("Idempotency-Key")
+        if not idempotency_key:
+            idempotency_key = hashlib.sha256(
+                json.dumps(data, sort_keys=True).encode()
+            ).hexdigest()
+
+        ingest, created = AttemptIngest.objects.get_or_create(
+            idempotency_key=idempotency_key, defaults={"payload": data}
+        )
+        if created or ingest.status != AttemptIngest.COMPLETED:
+            if not created and ingest.status == AttemptIngest.FAILED:
+                ingest.status = AttemptIngest.PENDING
+                ingest.retries = 0
+                ingest.save(update_fields=["status", "retries", "updated_at"])
+            transaction.on_commit(lambda: enqueue_attempt_ingest(ingest.id))
+        logger.info(f"attempt ingest {ingest.id} accepted")
+        return Response(
+            status=202, data={"ingest_id": ingest.id, "status": ingest.status}
         )
 
-        assessment_levels = all_levels.filter(category__name__iexact="assessment")
-        if assessment_levels.count() > 0:
-            completed_assessment_levels = LevelActivity.objects.filter(
-                module_activity=module_activity,
-                complete=True,
-                level__category__name__iexact="assessment",
-            )
 
-            if assessment_levels.count() == completed_assessment_levels.count():
-                module_activity.complete = True
-                module_activity.complete_date = datetime.now()
-                module_activity.save()
-            else:
-                module_activity.complete = False
-                module_activity.complete_date = None
-                module_activity.save()
-
-        # else:
-        #     training_levels = all_levels.filter(~Q(category__name__iexact="assessment"))
-        #     if training_levels.count() > 0:
-        #         completed_training_levels = LevelActivity.objects.filter(
-        #             ~Q(level__category__name__iexact="assessment"),
-        #             module_activity=module_activity,
-        #             complete=True,
-        #         )
-        #         if training_levels.count() == completed_training_levels.count():
-        #             module_activity.complete = True
-        #             module_activity.complete_date = datetime.now()
-        #             module_activity.save()
-        #         else:
-        #             module_activity.complete = False
-        #             module_activity.complete_date = None
-        #             module_activity.save()
-
-        UserActivity.objects.create(
-            module=main_module,
-            user=user,
-            duration=data["duration"],
-            start_time=datetime.fromtimestamp(int(data["startTime"]), tz),
-            end_time=datetime.fromtimestamp(int(data["endTime"]), tz),
-            log_event="module_activity",
+# api to get the processing status of an attempt sent to the ingest api
+class UserAttemptIngestStatusView(APIView):
+    def get(self, request, ingest_id):
+        try:
+            ingest = AttemptIngest.objects.get(id=ingest_id)
+        except AttemptIngest.DoesNotExist:
+            return Response(status=404, data={"error": "Ingest not found"})
+        return Response(
+            status=200,
+            data={
+                "ingest_id": ingest.id,
+                "status": ingest.status,
+                "attempt_id": ingest.attempt_id,
+                "error": ingest.error,
+                "retries": ingest.retries,
+            },
         )
 
-        logger.info("Successfully created attempt data")
-        return Response(status=201)
+
+def enqueue_attempt_ingest(ingest_id):
+    # the payload is already stored, so publishing is not retried: a broker
+    # outage only delays processing until requeue_pending_attempt_ingests
+    # picks the ingest up, instead of keeping the headset waiting
+    try:
+        process_attempt_ingest.apply_async((str(ingest_id),), retry=False)
+    except Exception:
+        logger.exception(f"could not enqueue attempt ingest {ingest_id}")
 
 
 # api to get attempt data for comparitive and inidvidual reports
@@ -486,37 +376,82 @@ class AttemptDataApiView(generics.GenericAPIView):
         attempt_number = serializer.data.get("attempt", None)
         organization_id = serializer.data.get("organization_id")
 
-        result = []
-        for id in user_ids:
-            try:
-                module_activity = ModuleActivity.objects.get(
-                    user__user_id=id,
+        attempts, errors = AttemptDataApiView.get_attempts(
+            user_ids, organization_id, module_name, level_name, attempt_number
+        )
+        if not attempts:
+            raise ValidationError(detail=list(dict.fromkeys(errors.values())))
+
+        result = list(attempts.values())
+        max_points = serializer.data.get("max_points")
+        ser = AttemptSerializer(
+            result,
+            many=True,
+            context={
+                # stored renders keep every point, decimated graphs are
+                # rendered on request
+                "renders": AttemptRenders.get_many(result) if not max_points else {},
+                "max_points": max_points,
+                "downsampling": serializer.data.get("downsampling"),
+            },
+        )
+        rendered = {attempt.id: data for attempt, data in zip(result, ser.data)}
+        response = []
+        for user_id in user_ids:
+            if user_id in attempts:
+                response.append({"user_id": user_id, **rendered[attempts[user_id].id]})
+            else:
+                response.append({"user_id": user_id, "error": errors[user_id]})
+        return Response(response, status=200)
+
+    def get_attempts(
+        user_ids, organization_id, module_name, level_name, attempt_number=None
+    ):
+        """
+        Resolves the attempt of each user in one query: the given attempt
+        number, or the latest attempt of the level. Returns the attempts and
+        the error of every user without one, both by user id.
+        """
+        attempts = Attempt.objects.filter(
+            level_activity__module_activity__user__user_id__in=user_ids,
+            level_activity__module_activity__user__organization_id=organization_id,
+            level_activity__module_activity__active=True,
+            level_activity__module_activity__module__module__name=module_name,
+            level_activity__level__name=level_name,
+        )
+        if attempt_number:
+            attempts = attempts.filter(attempt_number=attempt_number)
+        attempts = {
+            attempt.level_activity.module_activity.user.user_id: attempt
+            for attempt in attempts.select_related(
+                "level_activity__level",
+                "level_activity__module_activity__user",
+                "level_activity__module_activity__module__module",
+            )
+            .order_by(
+                "level_activity__module_activity__user_id", "-attempt_number", "-id"
+            )
+            .distinct("level_activity__module_activity__user_id")
+        }
+
+        errors = {}
+        missing = set(user_ids) - set(attempts)
+        if missing:
+            assigned = set(
+                ModuleActivity.objects.filter(
+                    user__user_id__in=missing,
                     user__organization__id=organization_id,
                     active=True,
                     module__module__name=module_name,
+                ).values_list("user__user_id", flat=True)
+            )
+            for user_id in missing:
+                errors[user_id] = (
+                    "Attempt Data not found"
+                    if user_id in assigned
+                    else "Module activity not found"
                 )
-                if module_activity:
-                    try:
-                        if attempt_number:
-                            attempt_data = Attempt.objects.get(
-                                attempt_number=attempt_number,
-                                level_activity__module_activity=module_activity,
-                                level_activity__level__name=level_name,
-                            )
-                        else:
-                            attempt_data = Attempt.objects.filter(
-                                level_activity__module_activity=module_activity,
-                                level_activity__level__name=level_name,
-                            ).order_by("-attempt_number")[0]
-                        result.append(attempt_data)
-                    except ObjectDoesNotExist:
-                        raise ValidationError(detail="Attempt Data not found")
-
-            except ObjectDoesNotExist:
-                raise ValidationError(detail="Module activity not found")
-
-        ser = AttemptSerializer(result, many=True)
-        return Response(ser.data, status=200)
+        return attempts, errors
 
 
 # api to get all the modules, levels for a specific user
@@ -655,10 +590,20 @@ class LevelActivityApiView(APIView):
             logger.error(f"Module with name {module_name} not found")
             return Response("Module not found", status=404)
 
+        sorted_data = AnalyticsCache.get(
+            "level-wise-analytics",
+            organization_id=int(org_id) if org_id is not None else None,
+            module_id=module.id,
+        )
+        return Response(sorted_data, status=200)
+
+    def get_level_analytics(organization_id, module_id):
+        module = Module.objects.get(id=module_id)
+
         level_activities = (
             LevelActivity.objects.filter(
                 module_activity__module__module=module,
-                module_activity__user__organization_id=org_id,
+                module_activity__user__organization_id=organization_id,
                 module_activity__active=True,
                 module_activity__user__active=True,
                 module_activity__user__deleted=False,
@@ -678,7 +623,7 @@ class LevelActivityApiView(APIView):
             response = []
             num_module_users = ModuleActivity.objects.filter(
                 module__module=module,
-                user__organization_id=org_id,
+                user__organization_id=organization_id,
                 user__deleted=False,
                 user__active=True,
                 active=True,
@@ -704,7 +649,7 @@ class LevelActivityApiView(APIView):
             sorted_data = sorted(
                 response, key=lambda x: float(x["progress_%"][:-1]), reverse=True
             )
-        return Response(sorted_data, status=200)
+        return sorted_data
 
 
 # api to get all users average performance for all the modules assigned
@@ -877,17 +822,28 @@ class ApplicationUsageApiView(APIView):
         serializer.is_valid(raise_exception=True)
         organization_id = serializer.validated_data["organization_id"]
         organization = Organization.objects.get(id=organization_id)
+        data = AnalyticsCache.get(
+            "application-usage",
+            organization_id=organization.id,
+            usecase=usecase,
+            day=date.today().isoformat(),
+        )
+        return Response(status=200, data=data)
+
+    def get_usage(organization_id, usecase=0, day=None):
+        # day only keys the cache, the usage is up to today
+        organization = Organization.objects.get(id=organization_id)
         data = {}
-        user_activity = UserActivity.objects.filter(user__organization=organization_id)
+        usage = DailyApplicationUsage.objects.filter(organization=organization_id)
 
         if usecase == 0:
             data = ApplicationUsage.get_organization_application_usage(
-                user_activity, organization
+                usage, organization
             )
         else:
-            data = ApplicationUsage.get_module_application_usage(user_activity)
+            data = ApplicationUsage.get_module_application_usage(usage)
 
-        return Response(status=200, data=data)
+        return data
 
 
 class UserPerformanceView(APIView):
@@ -1041,6 +997,34 @@ class AttemptWiseReportTableAPIView(APIView):
             i = i + 1
         return dates
 
+    def get_level_attempts(module_activities, start_date, end_date):
+        """
+        Attempts of the module activities that ended between the dates, read
+        in one query and grouped by level activity as (end dates, attempts),
+        both sorted by end date so a period can be sliced out with bisect.
+        """
+        level_attempts = defaultdict(list)
+        for attempt in Attempt.objects.filter(
+            level_activity__module_activity__in=[
+                module_activity.id for module_activity in module_activities
+            ],
+            end_time__date__gte=start_date,
+            end_time__date__lte=end_date,
+        ).only(
+            "level_activity_id", "attempt_number", "duration", "start_time", "end_time"
+        ):
+            level_attempts[attempt.level_activity_id].append(
+                (localtime(attempt.end_time).date(), attempt)
+            )
+        sorted_attempts = {}
+        for level_activity_id, attempts in level_attempts.items():
+            attempts.sort(key=lambda item: item[0])
+            sorted_attempts[level_activity_id] = (
+                [item[0] for item in attempts],
+                [item[1] for item in attempts],
+            )
+        return sorted_attempts
+
     def post(self, request):
         serializer = self.serializer_class(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -1075,18 +1059,7 @@ class AttemptWiseReportTableAPIView(APIView):
                     "error": "Invalid category filter. Possible category filters are  weekly, monthly and attempt_wise"
                 },
             )
-        user_activities = ModuleActivity.objects.filter(
-            module__module__name__in=module_names,
-            user__user_id=user_id,
-            user__organization__id=organization_id,
-            active=True,
-        ).prefetch_related(
-            Prefetch(
-                "levelactivity_set",
-                queryset=LevelActivity.objects.select_related("level"),
-            ),
-            "levelactivity_set__attempt_set",
-        )
+        periods = []
         for result in results.values():
             table_start_date_str = result.split("-")[0].strip()
             table_end_date_str = result.split("-")[1].strip()
@@ -1094,14 +1067,42 @@ class AttemptWiseReportTableAPIView(APIView):
                 table_start_date_str, "%Y/%m/%d"
             ).date()
             table_end_date = datetime.strptime(table_end_date_str, "%Y/%m/%d").date()
+            periods.append((table_start_date, table_end_date))
 
+        user_activities = list(
+            ModuleActivity.objects.filter(
+                module__module__name__in=module_names,
+                user__user_id=user_id,
+                user__organization__id=organization_id,
+                active=True,
+            ).prefetch_related(
+                Prefetch(
+                    "levelactivity_set",
+                    queryset=LevelActivity.objects.select_related("level"),
+                ),
+            )
+        )
+        level_attempts = {}
+        if periods:
+            level_attempts = AttemptWiseReportTableAPIView.get_level_attempts(
+                user_activities,
+                min(period[0] for period in periods),
+                max(period[1] for period in periods),
+            )
+        for table_start_date, table_end_date in periods:
             for index, user_activity in enumerate(user_activities):
                 level_activities = user_activity.levelactivity_set.all()
                 for level_activity in level_activities:
-                    attempts = level_activity.attempt_set.filter(
-                        end_time__date__gte=table_start_date,
-                        end_time__date__lte=table_end_date,
-                    ).order_by("-attempt_number", "-level_activity__level")
+                    end_dates, period_attempts = level_attempts.get(
+                        level_activity.id, ([], [])
+                    )
+                    first = bisect_left(end_dates, table_start_date)
+                    last = bisect_right(end_dates, table_end_date)
+                    attempts = sorted(
+                        period_attempts[first:last],
+                        key=lambda attempt: attempt.attempt_number,
+                        reverse=True,
+                    )
                     try:
                         if level_activity.complete:
                             success_rate = round(1 / len(attempts) * 100, 2)
@@ -1144,23 +1145,74 @@ class AttemptWiseReportTableAPIView(APIView):
 
 class AttemptWiseReportAPIView(APIView):
     permission_classes = [IsOrgOwnerOrStaff]
-    serializer_class = AttemptWiseReportSerializer
+    serializer_class = AttemptWiseSummarySerializer
 
     def get_required_records(start_date_str, end_date_str):
         start_date = datetime.strptime(start_date_str, "%Y-%m-%d")
         end_date = datetime.strptime(end_date_str, "%Y-%m-%d")
         return start_date, end_date
 
+    def get_summary(assigned_modules, totals, mistakes):
+        """
+        Report figures from the number of assigned modules, the attempt
+        aggregates and the mistakes grouped by module and name, in order of
+        first appearance.
+        """
+        total_attempts = totals.get("total_attempts", 0)
+        completed_levels = totals.get("completed_levels", 0)
+        total_time_spent = totals.get("total_time_spent", None) or timedelta()
+        mistakes_content = {}
+        for mistake in mistakes:
+            name = mistake["name"]
+            module_name = mistake["module__module__name"]
+            if name in mistakes_content:
+                mistakes_content[name]["count"] += mistake["count"]
+                if module_name not in mistakes_content[name]["module_names"]:
+                    mistakes_content[name]["module_names"].append(module_name)
+            else:
+                mistakes_content[name] = {
+                    "name": name,
+                    "count": mistake["count"],
+                    "module_names": [module_name],
+                }
+        mistakes_content = list(mistakes_content.values())
+        mistakes_count = sum([item["count"] for item in mistakes_content])
+        performance_trend = 0
+        success_rate = 0
+        if total_attempts > 0:
+            performance_trend = round(
+                100 - (mistakes_count / (mistakes_count + total_attempts) * 100), 2
+            )
+            if performance_trend.is_integer():
+                performance_trend = int(performance_trend)
+            success_rate = round(completed_levels / total_attempts * 100, 2)
+            if success_rate.is_integer():
+                success_rate = int(success_rate)
+        return {
+            "success_rate": success_rate,
+            "completed_levels": completed_levels,
+            "assigned_modules": assigned_modules,
+            "total_attempts": total_attempts,
+            "total_time_spent": PerformanceCalculations.convert_seconds_to_hms(
+                int(total_time_spent.total_seconds())
+            ),
+            "mistakes_content": mistakes_content,
+            "mistakes_count": mistakes_count,
+            "performance_trend": str(performance_trend) + "%",
+        }
+
     def post(self, request):
         serializer = self.serializer_class(data=request.data)
         serializer.is_valid(raise_exception=True)
         module_names = serializer.validated_data["module_names"]
-        user_id = serializer.validated_data["user_id"]
+        user_ids = serializer.validated_data.get("user_ids") or [
+            serializer.validated_data["user_id"]
+        ]
         organization_id = serializer.validated_data["organization_id"]
         start_date_str = serializer.validated_data["start_date"]
         end_date_str = serializer.validated_data["end_date"]
         assigned_modules = ModuleActivity.objects.filter(
-            user__user_id=user_id,
+            user__user_id__in=user_ids,
             module__module__name__in=module_names,
             user__organization__id=organization_id,
             active=True,
@@ -1170,79 +1222,76 @@ class AttemptWiseReportAPIView(APIView):
             start_date_str, end_date_str
         )
 
-        total_attempts = 0
-        total_time_spent = 0
-        mistakes_content = []
-        all_completed_levels = 0
-        for index, assigned_module in enumerate(assigned_modules):
-            total_levels = assigned_module.levelactivity_set.all()
-            module_name = module_names[index]
-            for total_level in total_levels:
-                attempts = total_level.attempt_set.filter(
-                    end_time__date__gte=start_date,
-                    end_time__date__lte=end_date,
-                )
-                total_attempts += len(attempts)
-                for attempt in attempts:
-                    total_time_spent += attempt.duration.seconds
-                    all_completed_levels += 1 if attempt.level_activity.complete else 0
-                    try:
-                        attempt = json.loads(attempt.data)
-                    except:
-                        attempt = attempt.data
-                    if "gameData" in attempt:
-                        if "mistakes" in attempt["gameData"]:
-                            for mistake in attempt["gameData"]["mistakes"]:
-                                name = mistake["name"]
-                                existing_mistake = next(
-                                    (
-                                        item
-                                        for item in mistakes_content
-                                        if item["name"] == name
-                                    ),
-                                    None,
-                                )
-                                if existing_mistake:
-                                    existing_mistake["count"] += mistake["count"]
-                                    if (
-                                        module_name
-                                        not in existing_mistake["module_names"]
-                                    ):
-                                        existing_mistake["module_names"].append(
-                                            module_name
-                                        )
-                                else:
-                                    mistakes_content.append(
-                                        {
-                                            "name": name,
-                                            "count": mistake["count"],
-                                            "module_names": [module_name],
-                                        }
-                                    )
-        mistakes_count = sum([item["count"] for item in mistakes_content])
-        performance_trend = 0
-        success_rate = 0
-        if total_attempts > 0:
-            performance_trend = round(
-                100 - (mistakes_count / (mistakes_count + total_attempts) * 100), 2
+        assigned_counts = dict(
+            assigned_modules.values("user__user_id")
+            .annotate(count=Count("id"))
+            .values_list("user__user_id", "count")
+            .order_by()
+        )
+        user_totals = {
+            totals.pop("level_activity__module_activity__user__user_id"): totals
+            for totals in Attempt.objects.filter(
+                level_activity__module_activity__in=assigned_modules,
+                end_time__date__gte=start_date,
+                end_time__date__lte=end_date,
             )
-            if performance_trend.is_integer():
-                performance_trend = int(performance_trend)
-            success_rate = round(all_completed_levels / total_attempts * 100, 2)
-            if success_rate.is_integer():
-                success_rate = int(success_rate)
-        data = {
-            "success_rate": success_rate,
-            "completed_levels": all_completed_levels,
-            "assigned_modules": len(assigned_modules),
-            "total_attempts": total_attempts,
-            "total_time_spent": PerformanceCalculations.convert_seconds_to_hms(
-                total_time_spent
+            .values("level_activity__module_activity__user__user_id")
+            .annotate(
+                total_attempts=Count("id"),
+                total_time_spent=Sum("duration"),
+                completed_levels=Count("id", filter=Q(level_activity__complete=True)),
+            )
+            .order_by()
+        }
+        user_mistakes = defaultdict(list)
+        for mistake in (
+            AttemptMistake.objects.filter(
+                attempt__level_activity__module_activity__in=assigned_modules,
+                timestamp__date__gte=start_date,
+                timestamp__date__lte=end_date,
+            )
+            .values("user__user_id", "module__module__name", "name")
+            .annotate(count=Sum("count"), first_id=Min("id"))
+            .order_by("first_id")
+        ):
+            user_mistakes[mistake.pop("user__user_id")].append(mistake)
+
+        totals = {
+            "total_attempts": sum(
+                user["total_attempts"] for user in user_totals.values()
+            ),
+            "total_time_spent": sum(
+                (user["total_time_spent"] for user in user_totals.values()),
+                timedelta(),
+            ),
+            "completed_levels": sum(
+                user["completed_levels"] for user in user_totals.values()
             ),
-            "mistakes_content": mistakes_content,
-            "mistakes_count": mistakes_count,
-            "performance_trend": str(performance_trend) + "%",
         }
+        data = AttemptWiseReportAPIView.get_summary(
+            sum(assigned_counts.values()),
+            totals,
+            sorted(
+                [
+                    mistake
+                    for mistakes in user_mistakes.values()
+                    for mistake in mistakes
+                ],
+                key=lambda mistake: mistake["first_id"],
+            ),
+        )
+        if serializer.validated_data.get("user_ids"):
+            data["users"] = [
+                {
+                    "user_id": user_id,
+                    **AttemptWiseReportAPIView.get_summary(
+                        assigned_counts.get(user_id, 0),
+                        user_totals.get(user_id, {}),
+                        user_mistakes[user_id],
+                    ),
+                }
+                for user_id in user_ids
+            ]
 
         return Response(status=200, data=data)
 
@@ -1264,7 +1313,9 @@ class PerformanceCharts(APIView):
         end_date = datetime.strptime(end_date_str, "%Y-%m-%d").date()
         try:
             module_attributes = (
-                ModuleAttributes.objects.filter(organization__id=organization_id)
+                ModuleAttributes.objects.filter(
+                    organization__id=organization_id, module__name__in=module_names
+                )
                 .values("module__name")
                 .annotate(
                     avg_passing_score=Avg("passing_score", default=0),
@@ -1282,25 +1333,71 @@ class PerformanceCharts(APIView):
             "level_activity__module_activity__user__deleted": False,
         }
 
+        # the chart counts attempts and duration within the requested dates,
+        # but scores and mistakes over the whole months those dates touch
+        first_month = start_date.replace(day=1)
+        last_month = end_date.replace(
+            day=calendar.monthrange(end_date.year, end_date.month)[1]
+        )
+        in_range = Q(
+            end_time__date__gte=start_date,
+            end_time__date__lte=end_date,
+        )
+        attempts = Attempt.objects.filter(
+            **attempt_filter,
+            level_activity__module_activity__module__module__name__in=module_names,
+            end_time__date__gte=first_month,
+            end_time__date__lte=last_month,
+        )
         attempts_data = (
-            Attempt.objects.filter(
-                **attempt_filter,
-                level_activity__module_activity__module__module__name__in=module_names,
-                end_time__date__gte=start_date,
-                end_time__date__lte=end_date,
-            )
-            .select_related("level_activity__module_activity__user")
-            .prefetch_related("level_activity__module_activity__module")
-            .annotate(month=TruncMonth("end_time"))
+            attempts.annotate(month=TruncMonth("end_time"))
             .values(
                 "month",
                 "level_activity__module_activity__module__module__name",
             )
             .annotate(
-                attempts_count=models.Count("id"), total_time_spent=Sum("duration")
+                attempts_count=Count("id", filter=in_range),
+                total_time_spent=Sum("duration", filter=in_range),
+                total_attempts=Count("id"),
+                # summed as numeric so the total does not depend on row order
+                total_score=Sum(
+                    Cast("score", DecimalField(max_digits=20, decimal_places=6))
+                ),
+                mistake_count=Coalesce(Sum("mistake_count"), 0),
             )
+            .filter(attempts_count__gt=0)
+            .order_by("month", "level_activity__module_activity__module__module__name")
         )
 
+        mistake_content = defaultdict(list)
+        for mistake in (
+            AttemptMistake.objects.filter(attempt__in=attempts)
+            .annotate(month=TruncMonth("timestamp"))
+            .values("month", "module__module__name", "name")
+            .annotate(first_id=Min("id"))
+            .order_by("first_id")
+        ):
+            mistake_content[(mistake["module__module__name"], mistake["month"])].append(
+                mistake["name"]
+            )
+
+        # ideal values keyed by module name, read once for the whole chart
+        ideal_values = {}
+        for attributes in module_attributes:
+            ideal_values[attributes["module__name"]] = {
+                "ideal_score": (
+                    int(attributes["avg_passing_score"])
+                    if not isinstance(attributes["avg_passing_score"], int)
+                    and float(attributes["avg_passing_score"]).is_integer()
+                    else attributes["avg_passing_score"]
+                ),
+                "ideal_mistake": (
+                    int(attributes["avg_ideal_mistake"])
+                    if not isinstance(attributes["avg_ideal_mistake"], int)
+                    and float(attributes["avg_ideal_mistake"]).is_integer()
+                    else attributes["avg_ideal_mistake"]
+                ),
+            }
         chart_data = defaultdict(list)
 
         for attempt in attempts_data:
@@ -1308,96 +1405,108 @@ class PerformanceCharts(APIView):
                 "level_activity__module_activity__module__module__name"
             ]
             month = attempt["month"]
-            attempts_count = attempt["attempts_count"]
-            total_time_spent = attempt["total_time_spent"]
-            total_time_spent_str = total_time_spent.total_seconds()
+            total_attempts = attempt["total_attempts"]
+            total_score = float(attempt["total_score"] or 0)
+            success_rate = round(total_score / (total_attempts * 100) * 100, 2)
+            if not isinstance(success_rate, int) and float(success_rate).is_integer():
+                success_rate = int(success_rate)
             chart_data[module_name].append(
                 {
                     "month_name": month.strftime("%b %Y"),
-                    "attempts_count": attempts_count,
-                    "duration": total_time_spent_str,
+                    "attempts_count": attempt["attempts_count"],
+                    "duration": attempt["total_time_spent"].total_seconds(),
+                    "success_score": success_rate,
+                    "mistake_score": attempt["mistake_count"],
+                    "mistake_content": mistake_content[(module_name, month)],
+                    **ideal_values.get(
+                        module_name, {"ideal_score": 0, "ideal_mistake": 0}
+                    ),
                 }
             )
 
-        for module_index, module_name in enumerate(chart_data):
-            for idx, month in enumerate(chart_data[module_name]):
-                month_str = month["month_name"]
-                first_day_of_month = datetime.strptime(month_str, "%b %Y")
-                last_day_of_month = first_day_of_month.replace(
-                    day=calendar.monthrange(
-                        first_day_of_month.year, first_day_of_month.month
-                    )[1]
-                )
+        return Response(status=200, data=chart_data)
 
-                attempts = Attempt.objects.filter(
-                    **attempt_filter,
-                    level_activity__module_activity__module__module__name=module_name,
-                    end_time__date__gte=first_day_of_month.date(),
-                    end_time__date__lte=last_day_of_month.date(),
-                ).only("data")
-
-                total_attempts = len(attempts)
-                total_score = 0
-                mistake_count = 0
-                mistake_content = []
-                success_rate = 0
-                for attempt in attempts:
-                    if isinstance(attempt.data, str):
-                        attempt_data = json.loads(attempt.data)
-                    else:
-                        attempt_data = attempt.data
-                    attempt_score = attempt_data.get("score", None)
-                    if attempt_score is not None:
-                        total_score += attempt_score
-
-                    if "gameData" in attempt_data:
-                        if "mistakes" in attempt_data["gameData"]:
-                            for mistake in attempt_data["gameData"]["mistakes"]:
-                                name = mistake["name"]
-                                if name not in mistake_content:
-                                    mistake_content.append(name)
-                            mistake_count += len(attempt_data["gameData"]["mistakes"])
-
-                    if total_attempts > 0:
-                        success_rate = round(
-                            total_score / (total_attempts * 100) * 100, 2
-                        )
-                    if (
-                        not isinstance(success_rate, int)
-                        and float(success_rate).is_integer()
-                    ):
-                        success_rate = int(success_rate)
 
-                    chart_data[module_name][idx]["success_score"] = success_rate
-                    chart_data[module_name][idx]["mistake_score"] = mistake_count
-                    chart_data[module_name][idx]["mistake_content"] = mistake_content
-                    chart_data[module_name][idx]["ideal_score"] = (
-                        int(module_attributes[module_index]["avg_passing_score"])
-                        if not isinstance(
-                            module_attributes[module_index]["avg_passing_score"], int
-                        )
-                        and float(
-                            module_attributes[module_index]["avg_passing_score"]
-                        ).is_integer()
-                        else module_attributes[module_index]["avg_passing_score"]
-                    )
-                    chart_data[module_name][idx]["ideal_mistake"] = (
-                        int(module_attributes[module_index]["avg_ideal_mistake"])
-                        if not isinstance(
-                            module_attributes[module_index]["avg_ideal_mistake"], int
-                        )
-                        and float(
-                            module_attributes[module_index]["avg_ideal_mistake"]
-                        ).is_integer()
-                        else module_attributes[module_index]["avg_ideal_mistake"]
-                    )
-        return Response(status=200, data=chart_data)
+class TopMistakesAPIView(APIView):
+    """
+    Most frequent mistakes of an organization overall, per module and per
+    month, optionally narrowed to modules, a user and a date range.
+    """
+
+    permission_classes = [IsOrgOwnerOrStaff]
+    serializer_class = TopMistakesSerializer
+
+    def post(self, request):
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        limit = serializer.validated_data["limit"]
+        mistake_filter = {
+            "organization_id": serializer.validated_data["organization_id"],
+            "user__deleted": False,
+        }
+        if serializer.validated_data.get("module_names"):
+            mistake_filter["module__module__name__in"] = serializer.validated_data[
+                "module_names"
+            ]
+        if serializer.validated_data.get("user_id"):
+            mistake_filter["user__user_id"] = serializer.validated_data["user_id"]
+        try:
+            if serializer.validated_data.get("start_date"):
+                mistake_filter["timestamp__date__gte"] = datetime.strptime(
+                    serializer.validated_data["start_date"], "%Y-%m-%d"
+                ).date()
+            if serializer.validated_data.get("end_date"):
+                mistake_filter["timestamp__date__lte"] = datetime.strptime(
+                    serializer.validated_data["end_date"], "%Y-%m-%d"
+                ).date()
+        except ValueError:
+            return Response(
+                status=400, data={"error": "Dates should be in YYYY-MM-DD format"}
+            )
+        mistakes = AttemptMistake.objects.filter(**mistake_filter)
+
+        top_mistakes = (
+            mistakes.values("name")
+            .annotate(count=Sum("count"), attempts=Count("attempt", distinct=True))
+            .order_by("-count", "name")[:limit]
+        )
+
+        module_mistakes = defaultdict(list)
+        for mistake in (
+            mistakes.values("module__module__name", "name")
+            .annotate(count=Sum("count"), attempts=Count("attempt", distinct=True))
+            .order_by("module__module__name", "-count", "name")
+        ):
+            module_name = mistake.pop("module__module__name")
+            if len(module_mistakes[module_name]) < limit:
+                module_mistakes[module_name].append(mistake)
+
+        trend = []
+        for mistake in (
+            mistakes.annotate(month=TruncMonth("timestamp"))
+            .values("month", "name")
+            .annotate(count=Sum("count"))
+            .order_by("month", "-count", "name")
+        ):
+            month_name = mistake["month"].strftime("%b %Y")
+            if not trend or trend[-1]["month_name"] != month_name:
+                trend.append({"month_name": month_name, "mistakes": []})
+            trend[-1]["mistakes"].append(
+                {"name": mistake["name"], "count": mistake["count"]}
+            )
+
+        data = {
+            "top_mistakes": list(top_mistakes),
+            "module_mistakes": module_mistakes,
+            "trend": trend,
+        }
+        return Response(status=200, data=data)
 
 
 class ApplicationUsageAnalyticsAPIView(APIView):
     permission_classes = [IsAdmin]
 
-    def get_merge_data(self, data1, data2, data3):
+    def get_merge_data(data1, data2, data3):
         data1_dict = {item["name"]: item for item in data1}
         data2_dict = {item["name"]: item for item in data2}
         data3_dict = {item["name"]: item for item in data3}
@@ -1420,6 +1529,10 @@ class ApplicationUsageAnalyticsAPIView(APIView):
         return sorted_organization_info
 
     def get(self, request, usecase=0):
+        data = AnalyticsCache.get("application-usage-analytics", usecase=usecase)
+        return Response(status=200, data=data)
+
+    def get_analytics(usecase=0):
         if not bool(usecase):
             organizations = Organization.objects.exclude(
                 Q(name__iexact="cusmat") | Q(name__isnull=True)
@@ -1451,11 +1564,11 @@ class ApplicationUsageAnalyticsAPIView(APIView):
                 )
             ).values("name", "total_duration")
 
-            sorted_organization_info = self.get_merge_data(
+            sorted_organization_info = ApplicationUsageAnalyticsAPIView.get_merge_data(
                 total_users, total_modules, time_spent
             )
 
-            return Response(status=200, data=sorted_organization_info)
+            return sorted_organization_info
         else:
             modules = Module.objects.all()
             total_users = modules.annotate(
@@ -1485,11 +1598,11 @@ class ApplicationUsageAnalyticsAPIView(APIView):
                 total_duration=Coalesce(Sum("useractivity__duration"), timedelta()),
             ).values("name", "total_duration")
 
-            sorted_module_info = self.get_merge_data(
+            sorted_module_info = ApplicationUsageAnalyticsAPIView.get_merge_data(
                 total_users, total_organizations, time_spent
             )
 
-            return Response(status=200, data=sorted_module_info)
+            return sorted_module_info
 
 
 class TotalActiveModuleAndUsersAPIView(APIView):
@@ -1510,6 +1623,13 @@ class TotalActiveModuleAndUsersAPIView(APIView):
         return total_count, rate_of_change
 
     def get(self, request):
+        response_data = AnalyticsCache.get(
+            "total-active-module-and-users", day=date.today().isoformat()
+        )
+        return Response(status=200, data=response_data)
+
+    def get_totals(day=None):
+        # day only keys the cache, the rates of change are of the current month
         (
             total_modules,
             modules_rate_of_change,
@@ -1584,16 +1704,23 @@ class TotalActiveModuleAndUsersAPIView(APIView):
             }
         ]
 
-        return Response(status=200, data=response_data)
+        return response_data
 
 
 class AdminOrganizationApplicationUsageAPIView(APIView):
     permission_classes = [IsAdmin]
 
     def get(self, request):
-        user_activity = UserActivity.objects.all().exclude(
-            Q(user__organization__name__iexact="cusmat")
-            | Q(user__organization__isnull=True)
+        usage = DailyApplicationUsage.objects.exclude(
+            Q(organization__name__iexact="cusmat") | Q(organization__isnull=True)
         )
-        data = ApplicationUsage.get_organization_application_usage(user_activity)
+        data = ApplicationUsage.get_organization_application_usage(usage)
         return Response(status=200, data=data)
+
+
+# api to get the hit and miss counts of the cached analytics endpoints
+class AnalyticsCacheMetricsView(APIView):
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        return Response(status=200, data=AnalyticsCache.get_metrics())